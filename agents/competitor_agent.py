@@ -1,19 +1,72 @@
 # agents/competitor_agent.py
 from .base_agent import BaseAgent
-from services.osm_service import search_places_osm
-import statistics
+from db.helpers import get_connection
+from db.setup_db import migrate
+from utils.spatial import M_PER_DEG_LAT, haversine_km
+import math
+import threading
+
+# R*Tree bounding-box lookup (businesses_rtree, see db/setup_db.py), exact distance in Python
+_NEARBY_SQL = """
+SELECT b.id, b.name, b.lat, b.lng, b.address, b.type
+FROM businesses_rtree r JOIN businesses b ON b.id = r.id
+WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?
+"""
 
 class CompetitorAgent(BaseAgent):
+    """
+    Counts stored businesses (data/businesses.db) within radius_km of a lead, optionally only
+    those of the same type. Backed by a SQLite R*Tree, so a lookup is a local index probe
+    instead of a Nominatim search.
+    """
+
     def __init__(self):
         super().__init__("CompetitorAgent")
+        # opened on the first lookup and shared by the orchestrator's I/O workers; close() releases it
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # caller holds self._lock
+        if self._conn is None:
+            self._conn = get_connection()
+            migrate(self._conn)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def nearby(self, lat, lng, radius_km=2, business_type=None):
+        """Stored businesses within radius_km of (lat, lng), nearest first, each with distance_km."""
+        dlat = radius_km * 1000 / M_PER_DEG_LAT
+        dlng = dlat / max(0.01, math.cos(math.radians(lat)))
+        sql, params = _NEARBY_SQL, [lat - dlat, lat + dlat, lng - dlng, lng + dlng]
+        if business_type:
+            sql += " AND b.type = ? COLLATE NOCASE"
+            params.append(business_type)
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        out = []
+        for bid, name, blat, blng, address, btype in rows:
+            d = haversine_km(lat, lng, blat, blng)
+            if d <= radius_km:
+                out.append({"id": bid, "name": name, "lat": blat, "lng": blng, "address": address,
+                            "type": btype, "distance_km": round(d, 3)})
+        out.sort(key=lambda r: r["distance_km"])
+        return out
 
-    def run(self, business_name, lat, lng, radius_km=2, limit=10):
+    def run(self, business_name, lat, lng, radius_km=2, limit=10, business_type=None):
+        if lat is None or lng is None:
+            self._log(f"No coordinates for {business_name}; competitor count unavailable")
+            return {"competitor_count": 0, "sample_competitors": [], "radius_km": radius_km}
         self._log(f"Looking for competitors near {lat},{lng}")
-        # We do a local search around same city via a naive search: use same business type search by name tokens
-        tokens = business_name.split()
-        query = tokens[0]  # naive
-        results = search_places_osm(query, city=None, limit=limit)
-        # For simplicity, compute competitor count and placeholder metrics
-        comp_count = len(results)
-        self._log(f"Found {comp_count} competitors (approx)")
-        return {"competitor_count": comp_count, "sample_competitors": results[:5]}
+        found = self.nearby(lat, lng, radius_km=radius_km, business_type=business_type)
+        # the lead itself may already be stored from an earlier run
+        me = (business_name or "").strip().lower()
+        competitors = [r for r in found if not ((r["name"] or "").strip().lower() == me and r["distance_km"] < 0.1)]
+        comp_count = len(competitors)
+        self._log(f"Found {comp_count} competitors within {radius_km} km")
+        return {"competitor_count": comp_count, "sample_competitors": competitors[:min(5, limit)], "radius_km": radius_km}
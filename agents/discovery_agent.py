@@ -1,43 +1,73 @@
 # agents/discovery_agent.py
-import time, traceback, requests
-from services.google_places import is_enabled as gp_enabled, search_places_google, get_place_details
+import math, traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services import geocoder
+from services.google_places import (is_enabled as gp_enabled, iter_places_google, get_place_details,
+                                    get_place_details_many, UsageCounter, DETAILS_FIELDS, DETAILS_CONCURRENCY)
+from services.osm_service import search_places_osm, MAX_LIMIT as OSM_CAP
 # from services.geoapify import is_enabled as ga_enabled, search_places_geoapify
 from services.web_search import duckduckgo_search_urls
-from services.site_scraper import extract_social_links, extract_emails_and_phones
+from services.site_scraper import PageCache, extract_social_links, extract_emails_and_phones
+from utils.spatial import PlaceIndex
+
+# Google text search stops after 3 pages of 20
+GOOGLE_CAP = 60
+# a Google cell counts as saturated when this share of the cap fell inside the cell
+# (location is only a bias, so part of every answer lies outside the cell)
+GOOGLE_SATURATION = 0.8
+
+def _split_bbox(bbox, n):
+    """(south, north, west, east) -> n*n equal cells"""
+    south, north, west, east = bbox
+    dlat = (north - south) / n
+    dlng = (east - west) / n
+    return [(south + i * dlat, south + (i + 1) * dlat, west + j * dlng, west + (j + 1) * dlng)
+            for i in range(n) for j in range(n)]
+
+def _cell_area_km2(cell):
+    south, north, west, east = cell
+    mid = math.radians((south + north) / 2)
+    return abs(north - south) * 111.32 * abs(east - west) * 111.32 * math.cos(mid)
+
+def _in_cell(p, cell):
+    south, north, west, east = cell
+    lat, lng = p.get("lat"), p.get("lng")
+    return lat is not None and lng is not None and south <= lat <= north and west <= lng <= east
 
 class DiscoveryAgent:
-    def __init__(self):
+    def __init__(self, details_concurrency=None, details_fields=DETAILS_FIELDS):
         self.name = "DiscoveryAgent"
+        self.details_concurrency = details_concurrency or DETAILS_CONCURRENCY
+        self.details_fields = details_fields
+        # per-run numbers, e.g. {"google": {"text_search": 2, "details": 18}}
+        self.stats = {}
 
     def _log(self, *args):
         print(f"[DiscoveryAgent]", *args)
 
     def geocode_city(self, city):
-        """Return (lat,lon) using Nominatim or None"""
+        """Return (lat,lon) using Nominatim or None (cached, see services/geocoder.py)"""
         try:
-            url = "https://nominatim.openstreetmap.org/search"
-            resp = requests.get(url, params={"q": city, "format": "json", "limit": 1},
-                                headers={"User-Agent": "ai-business-intel-bot/1.0"}, timeout=8)
-            resp.raise_for_status()
-            data = resp.json()
-            if data:
-                return float(data[0]["lat"]), float(data[0]["lon"])
+            return geocoder.geocode_city(city)
         except Exception as e:
             self._log("geocode_city error:", e)
         return None
 
-    def run(self, business_type, city, limit=10, radius_km=5):
+    def run(self, business_type, city, limit=10, radius_km=5, pages=None):
+        """
+        pages: optional PageCache shared with later enrichment so websites crawled here
+        are not downloaded again.
+        """
         self._log(f"Searching for '{business_type}' in {city} limit={limit}")
+        if pages is None:
+            pages = PageCache()
 
-        results = []
-        seen = set()
+        # near-identical places from different providers merge into one record (with "sources")
+        index = PlaceIndex()
+        results = index.records
 
         def add(item, source):
-            key = f"{(item.get('name') or '').strip().lower()}|{item.get('lat')}|{item.get('lng')}"
-            if key in seen:
-                return
-            seen.add(key)
-            results.append({**item, "source": source})
+            index.add(item, source)
 
         # Try geocode city to bias searches
         loc = self.geocode_city(city)
@@ -51,36 +81,48 @@ class DiscoveryAgent:
 
 
         # 1) Google: pass location if available
+        usage = UsageCounter()
+        self.stats = {"google": usage.counts}
         if gp_enabled():
             try:
                 q = f"{business_type} in {city}"
                 self._log("Google enabled; querying with location:", location_param)
-                g = search_places_google(q, location=location_param, radius_km=radius_km, limit=limit)
-                for r in g:
-                    if not isinstance(r, dict):
-                        continue
+                # streamed page by page; Details for page 1 run while page 2 is loading
+                pending = []
+                requested = set()
+                with ThreadPoolExecutor(max_workers=self.details_concurrency, thread_name_prefix="gp-details") as pool:
+                    for r in iter_places_google(q, location=location_param, radius_km=radius_km, limit=limit, usage=usage):
+                        pid = r.get("place_id")
+                        fut = None
+                        if pid and pid not in requested:
+                            requested.add(pid)
+                            fut = pool.submit(get_place_details, pid, self.details_fields, usage)
+                        pending.append((r, fut))
+                for r, fut in pending:
                     details = {}
-                    if r.get("place_id"):
+                    if fut is not None:
                         try:
-                            details = get_place_details(r.get("place_id"))
+                            details = fut.result()
                         except Exception:
                             details = {}
                     item = {
+                        "place_id": r.get("place_id"),
                         "name": r.get("name"),
                         "lat": r.get("lat"),
                         "lng": r.get("lng"),
                         "address": r.get("address"),
                         "phone": details.get("formatted_phone_number"),
                         "website": details.get("website"),
-                        "raw": {**r, "details": details}
+                        "raw": {**r["raw"], "details": details}
                     }
                     add(item, "google")
+                self._log(f"Google billable calls: {usage.snapshot()}")
                 if len(results) >= limit:
                     self._log("Google filled required results")
+                    self.stats["merged_duplicates"] = index.merged
                     return results[:limit]
             except Exception:
                 self._log("Google error:", traceback.format_exc())
-        time.sleep(0.3)
 
         # # 2) Geoapify fallback
         # if ga_enabled() and len(results) < limit:
@@ -126,8 +168,8 @@ class DiscoveryAgent:
             if item.get("website"):
                 self._log(f"Crawling website for socials: {item['website']}")
                 try:
-                    socials = extract_social_links(item["website"])
-                    emails, phones = extract_emails_and_phones(item["website"])
+                    socials = extract_social_links(item["website"], pages=pages)
+                    emails, phones = extract_emails_and_phones(item["website"], pages=pages)
                     
                     if socials.get("instagram"):
                         item["instagram"] = socials["instagram"][0]
@@ -150,5 +192,97 @@ class DiscoveryAgent:
                 except Exception as e:
                     self._log("Error enriching website:", e)
 
-
+        self.stats["merged_duplicates"] = index.merged
         return results[:limit]
+
+    def _query_cell(self, business_type, cell, provider, usage):
+        """Return (places inside the cell, saturated) for one tile."""
+        if provider == "google":
+            south, north, west, east = cell
+            center = f"{(south + north) / 2},{(west + east) / 2}"
+            # radius that reaches the cell corners
+            radius_km = math.hypot((north - south) * 111.32 / 2,
+                                   (east - west) * 111.32 * math.cos(math.radians((south + north) / 2)) / 2)
+            places = list(iter_places_google(business_type, location=center, radius_km=radius_km,
+                                             limit=GOOGLE_CAP, usage=usage))
+            inside = [p for p in places if _in_cell(p, cell)]
+            return inside, len(inside) >= GOOGLE_CAP * GOOGLE_SATURATION
+        places = search_places_osm(business_type, limit=OSM_CAP, viewbox=cell)
+        return places, len(places) >= OSM_CAP
+
+    def run_tiled(self, business_type, city, provider=None, initial_grid=4, max_depth=4, workers=4,
+                  max_results=None, with_details=False):
+        """
+        Full-city sweep: split the geocoded city bounding box into initial_grid x initial_grid cells,
+        query each cell concurrently and split any cell that hits the provider result cap into
+        four (up to max_depth levels). Results are merged and de-duplicated across tiles.
+        provider: "google" or "osm" (default: google when enabled).
+        with_details: also fetch Google Place Details (phone/website) for every unique place; billed per place.
+        Returns the merged list; self.stats["tiling"] reports coverage and duplicate hits.
+        """
+        provider = provider or ("google" if gp_enabled() else "osm")
+        rec = geocoder.geocode(city)
+        if not rec or not rec.get("bbox"):
+            self._log(f"Cannot tile {city}: no bounding box from geocoder")
+            return []
+        bbox = rec["bbox"]
+        self._log(f"Tiled search for '{business_type}' in {city} via {provider}, bbox={bbox}")
+
+        usage = UsageCounter()
+        stats = {"provider": provider, "cells_queried": 0, "cells_split": 0, "cells_capped": 0, "cells_failed": 0,
+                 "raw_hits": 0, "duplicates": 0, "area_km2": round(_cell_area_km2(bbox), 2), "covered_km2": 0.0}
+        self.stats = {"google": usage.counts, "tiling": stats}
+
+        index = PlaceIndex()
+        results = index.records
+
+        def merge(p):
+            if index.add(p, provider)[1]:
+                stats["duplicates"] += 1
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile") as pool:
+            pending = {pool.submit(self._query_cell, business_type, c, provider, usage): (c, 0)
+                       for c in _split_bbox(bbox, initial_grid)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    cell, depth = pending.pop(f)
+                    stats["cells_queried"] += 1
+                    try:
+                        places, saturated = f.result()
+                    except Exception as e:
+                        self._log("Tile query failed:", e)
+                        stats["cells_failed"] += 1
+                        continue
+                    stats["raw_hits"] += len(places)
+                    for p in places:
+                        merge(p)
+                    if max_results and len(results) >= max_results:
+                        continue
+                    if saturated and depth < max_depth:
+                        stats["cells_split"] += 1
+                        for child in _split_bbox(cell, 2):
+                            pending[pool.submit(self._query_cell, business_type, child, provider, usage)] = (child, depth + 1)
+                    elif saturated:
+                        stats["cells_capped"] += 1
+                    else:
+                        stats["covered_km2"] += _cell_area_km2(cell)
+                if max_results and len(results) >= max_results:
+                    # drop queued tiles; ones already running finish and are merged
+                    pending = {f: v for f, v in pending.items() if not f.cancel()}
+
+        stats["covered_km2"] = round(stats["covered_km2"], 2)
+        stats["coverage"] = round(stats["covered_km2"] / stats["area_km2"], 3) if stats["area_km2"] else 0.0
+        stats["unique"] = len(results)
+        if max_results:
+            results = results[:max_results]
+
+        if provider == "google" and with_details:
+            details = get_place_details_many([r.get("place_id") for r in results], fields=self.details_fields,
+                                             max_workers=self.details_concurrency, usage=usage)
+            for r in results:
+                d = details.get(r.get("place_id"), {})
+                r["phone"] = d.get("formatted_phone_number")
+                r["website"] = d.get("website")
+        self._log(f"Tiling done: {stats}; Google billable calls: {usage.snapshot()}")
+        return results
@@ -1,59 +1,116 @@
 # agents/growth_agent.py
 from .base_agent import BaseAgent
 import math
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
+import os
+from utils import generation_cache, llm_worker, model_registry
 
 # Load a small free model (flan-t5-small). This will download on first run.
 MODEL_NAME = "google/flan-t5-small"
+# when the orchestrator generates score explanations: "inline" (before a lead is saved),
+# "deferred" (leads are saved first, then explanation and pitch are patched into meta) or "off"
+EXPLAIN_MODE = os.getenv("GROWTH_EXPLAIN", "deferred").lower()
+
+# Heuristic opportunity score parameters, shared with the bulk re-scorer (agents/scoring_agent.py)
+SCORING_WEIGHTS = {
+    "site": 0.6,                # weight of the site-health score
+    "social": 0.7,              # weight of the social score
+    "facebook_per_point": 10,   # followers per social point, capped
+    "facebook_cap": 50,
+    "instagram_per_point": 20,
+    "instagram_cap": 30,
+    "twitter_per_point": 2,     # avg likes per social point, capped
+    "twitter_cap": 20,
+    "competitor_baseline": 10,  # fewer competitors than this adds opportunity...
+    "competitor_bonus": 5,      # ...this much per missing competitor
+    "high": 70,                 # grade thresholds (strictly greater than)
+    "medium": 40,
+}
 
 class GrowthAgent(BaseAgent):
     def __init__(self):
         super().__init__("GrowthAgent")
-        self._log("Loading local LLM model (may take a moment)...")
-        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
-        # use no_cuda by default if torch.device not cuda
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+        # shared with PitchAgent through the registry; loaded on first use
+        self.llm = model_registry.acquire(MODEL_NAME)
+
+    @property
+    def tokenizer(self):
+        return self.llm.tokenizer
+
+    @property
+    def model(self):
+        return self.llm.model
+
+    @property
+    def device(self):
+        return self.llm.device
+
+    def close(self):
+        self.llm.release()
 
     def _llm_explain(self, prompt, max_new_tokens=128):
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-        out = self.model.generate(**inputs, max_new_tokens=max_new_tokens)
-        decoded = self.tokenizer.decode(out[0], skip_special_tokens=True)
-        return decoded
+        return self._llm_explain_batch([prompt], max_new_tokens=max_new_tokens)[0]
 
-    def run(self, aggregated_signal):
-        """
-        aggregated_signal: dict with keys: site_health (score 0-100), social (dict), competitor (competitor_count), reviews (optional)
-        """
-        site_score = aggregated_signal.get("site_health", {}).get("score", 0)
-        social = aggregated_signal.get("social", {})
-        # compute social score heuristics
+    def _llm_explain_batch(self, prompts, max_new_tokens=128, batch_size=None):
+        return generation_cache.generate(
+            self.llm.cache_id, {"max_new_tokens": max_new_tokens}, prompts,
+            lambda todo: llm_worker.generate(self.llm, todo, max_new_tokens=max_new_tokens, batch_size=batch_size))
+
+    def _social_score(self, social):
+        w = SCORING_WEIGHTS
         social_score = 0
         # facebook followers if available
         if social.get("facebook") and isinstance(social["facebook"], dict) and social["facebook"].get("followers"):
-            social_score += min(50, social["facebook"].get("followers", 0) / 10)  # scaling
+            social_score += min(w["facebook_cap"], social["facebook"].get("followers", 0) / w["facebook_per_point"])  # scaling
         if social.get("instagram") and isinstance(social["instagram"], dict) and social["instagram"].get("followers"):
-            social_score += min(30, social["instagram"].get("followers", 0) / 20)
+            social_score += min(w["instagram_cap"], social["instagram"].get("followers", 0) / w["instagram_per_point"])
         # twitter engagement
         if social.get("twitter") and isinstance(social["twitter"], dict):
-            social_score += min(20, social["twitter"].get("avg_likes", 0) / 2)
+            social_score += min(w["twitter_cap"], social["twitter"].get("avg_likes", 0) / w["twitter_per_point"])
+        return social_score
+
+    def score(self, aggregated_signal):
+        """
+        Heuristic part of run(): {"opportunity_score", "grade", "explanation": None}. No model call.
+        """
+        w = SCORING_WEIGHTS
+        site_score = aggregated_signal.get("site_health", {}).get("score", 0)
+        social_score = self._social_score(aggregated_signal.get("social", {}))
         competitor_count = aggregated_signal.get("competitor", {}).get("competitor_count", 0)
         # opportunity score: low competitors + low social/site => high opportunity
-        opportunity = max(0, 100 - (site_score * 0.6 + social_score * 0.7) + max(0, 10 - competitor_count) * 5)
+        opportunity = max(0, 100 - (site_score * w["site"] + social_score * w["social"])
+                          + max(0, w["competitor_baseline"] - competitor_count) * w["competitor_bonus"])
         # normalize
         opportunity = max(0, min(100, opportunity))
         grade = "LOW"
-        if opportunity > 70:
+        if opportunity > w["high"]:
             grade = "HIGH"
-        elif opportunity > 40:
+        elif opportunity > w["medium"]:
             grade = "MEDIUM"
-        # LLM explanation
-        prompt = (
+        return {"opportunity_score": opportunity, "grade": grade, "explanation": None}
+
+    def _explain_prompt(self, aggregated_signal, score):
+        return (
             "You are an explainable scoring assistant. Given the site score, social signals, and competitor info, "
-            f"explain concisely why opportunity={opportunity:.1f} and grade={grade}. "
-            f"Site score: {site_score}. Social sample: {social}. Competitors: {competitor_count}.\n\nExplanation:"
+            f"explain concisely why opportunity={score['opportunity_score']:.1f} and grade={score['grade']}. "
+            f"Site score: {aggregated_signal.get('site_health', {}).get('score', 0)}. "
+            f"Social sample: {aggregated_signal.get('social', {})}. "
+            f"Competitors: {aggregated_signal.get('competitor', {}).get('competitor_count', 0)}.\n\nExplanation:"
         )
-        explanation = self._llm_explain(prompt, max_new_tokens=128)
-        return {"opportunity_score": opportunity, "grade": grade, "explanation": explanation}
+
+    def explain_batch(self, items, batch_size=None):
+        """
+        LLM explanations for already computed scores. items: [(aggregated_signal, score), ...];
+        returns one explanation string per item, in order.
+        """
+        prompts = [self._explain_prompt(signal, score) for signal, score in items]
+        return self._llm_explain_batch(prompts, max_new_tokens=128, batch_size=batch_size)
+
+    def run(self, aggregated_signal, explain=True):
+        """
+        aggregated_signal: dict with keys: site_health (score 0-100), social (dict), competitor (competitor_count), reviews (optional)
+        explain=False skips the LLM explanation (see score() / explain_batch()).
+        """
+        score = self.score(aggregated_signal)
+        if explain:
+            score["explanation"] = self.explain_batch([(aggregated_signal, score)])[0]
+        return score
@@ -4,16 +4,44 @@ from .discovery_agent import DiscoveryAgent
 from .digital_presence_agent import DigitalPresenceAgent
 from .social_agent import SocialAgent
 from .competitor_agent import CompetitorAgent
-from .growth_agent import GrowthAgent
+from .growth_agent import GrowthAgent, EXPLAIN_MODE
 from .pitch_agent import PitchAgent
 from .compliance_agent import ComplianceAgent
-from utils.db import init_db, SessionLocal, save_business
+from utils.db import init_db, SessionLocal, update_meta, upsert_business
+from services import http_cache, http_client, rate_limiter
+from utils import generation_cache, llm_worker, model_registry
 from services.web_search import find_profiles_by_search
-from services.site_scraper import extract_emails_from_site, extract_phones_from_site
+from services.site_scraper import PageCache, extract_emails_from_site, extract_phones_from_site
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
+import re
+
+# Worker pool sizes for concurrent mode (override via env)
+IO_WORKERS = int(os.getenv("ORCH_IO_WORKERS", "8"))
+LEAD_WORKERS = int(os.getenv("ORCH_LEAD_WORKERS", "4"))
+LLM_WORKERS = int(os.getenv("ORCH_LLM_WORKERS", "1"))
+# radius of the competitor count stored in meta.competitor (the run's radius_km is the discovery area)
+COMPETITOR_RADIUS_KM = float(os.getenv("COMPETITOR_RADIUS_KM", "2"))
+
+
+class _InlineExecutor:
+    """Executor look-alike that runs work immediately; used for the sequential mode."""
+
+    def submit(self, fn, *args, **kwargs):
+        f = Future()
+        try:
+            f.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            f.set_exception(e)
+        return f
+
+    def shutdown(self, wait=True):
+        pass
+
 
 class Orchestrator(BaseAgent):
-    def __init__(self):
+    def __init__(self, io_workers=None, lead_workers=None, llm_workers=None, pitch_batch_size=None, explain=None,
+                 competitor_radius_km=None):
         super().__init__("Orchestrator")
         self.discovery = DiscoveryAgent()
         self.digital = DigitalPresenceAgent()
@@ -22,153 +50,273 @@ class Orchestrator(BaseAgent):
         self.growth = GrowthAgent()
         self.pitch = PitchAgent()
         self.compliance = ComplianceAgent()
+        self.io_workers = io_workers or IO_WORKERS
+        self.lead_workers = lead_workers or LEAD_WORKERS
+        # the local models are not safe to drive from many threads, keep this lane small
+        self.llm_workers = llm_workers or LLM_WORKERS
+        # None -> LLM_BATCH_SIZE (utils/model_registry.py)
+        self.pitch_batch_size = pitch_batch_size
+        # "inline" | "deferred" | "off", see GROWTH_EXPLAIN in agents/growth_agent.py
+        self.explain = (explain or EXPLAIN_MODE).lower()
+        self.competitor_radius_km = competitor_radius_km or COMPETITOR_RADIUS_KM
         init_db()
         self.db = SessionLocal()
 
-    def run(self, business_type, city, limit=10, radius_km=5, language="en"):
-        results = []
-        found = self.discovery.run(business_type, city, limit=limit, radius_km=radius_km)
-        for b in found:
-            name = b.get("name") or "Unknown"
-            self._log(f"Processing: {name}")
-            website = b.get("website")
-            phone = b.get("phone")
-            email_candidates = []
-            linkedin = None
-            instagram = None
-
-            digital_info = {}
-            if website:
-                digital_info = self.digital.run(website)
-                emails = extract_emails_from_site(website)
-                phones = extract_phones_from_site(website)
-                if emails:
-                    email_candidates.extend(emails)
-                if phones and not phone:
-                    phone = phones[0]
-                social_links = digital_info.get("social_links", {})
-                if social_links.get("linkedin"):
-                    linkedin = social_links["linkedin"][0]
-                if social_links.get("instagram"):
-                    instagram = social_links["instagram"][0]
-            else:
-                self._log("No website; using web search to find profiles")
-                found_profiles = find_profiles_by_search(name, city=city, max_results=6)
-                if found_profiles.get("website_candidates"):
-                    website_guess = found_profiles["website_candidates"][0]
-                    self._log(f"Found website candidate: {website_guess}")
-                    try:
-                        digital_info = self.digital.run(website_guess)
-                        emails = extract_emails_from_site(website_guess)
-                        phones = extract_phones_from_site(website_guess)
-                        if emails:
-                            email_candidates.extend(emails)
-                        if phones and not phone:
-                            phone = phones[0]
-                    except Exception:
-                        pass
-                if found_profiles.get("linkedin"):
-                    linkedin = found_profiles["linkedin"][0]
-                if found_profiles.get("instagram"):
-                    instagram = found_profiles["instagram"][0]
-
-            # social discovery / guess
-            social_info = {}
-            if instagram or linkedin:
-                social_links = {}
-                if instagram:
-                    social_links["instagram"] = [instagram]
-                if linkedin:
-                    social_links["linkedin"] = [linkedin]
-                social_info = self.social.run(social_links)
+    def _analyze_website(self, url, io, pages):
+        """Run site analysis and contact extraction for one website in parallel (one download via `pages`)."""
+        digital_f = io.submit(self.digital.run, url, pages=pages)
+        emails_f = io.submit(extract_emails_from_site, url, pages=pages)
+        phones_f = io.submit(extract_phones_from_site, url, pages=pages)
+        return digital_f.result(), emails_f.result(), phones_f.result()
+
+    def _web_and_social(self, b, city, phone, io, pages):
+        """
+        Website analysis followed by social lookups (social depends on the links found on the site).
+        Returns (digital_info, email_candidates, phone, social_info).
+        """
+        name = b.get("name") or "Unknown"
+        website = b.get("website")
+        email_candidates = []
+        linkedin = None
+        instagram = None
+
+        digital_info = {}
+        if website:
+            digital_info, emails, phones = self._analyze_website(website, io, pages)
+            if emails:
+                email_candidates.extend(emails)
+            if phones and not phone:
+                phone = phones[0]
+            social_links = digital_info.get("social_links", {})
+            if social_links.get("linkedin"):
+                linkedin = social_links["linkedin"][0]
+            if social_links.get("instagram"):
+                instagram = social_links["instagram"][0]
+        else:
+            self._log("No website; using web search to find profiles")
+            found_profiles = find_profiles_by_search(name, city=city, max_results=6)
+            if found_profiles.get("website_candidates"):
+                website_guess = found_profiles["website_candidates"][0]
+                self._log(f"Found website candidate: {website_guess}")
+                try:
+                    digital_info, emails, phones = self._analyze_website(website_guess, io, pages)
+                    if emails:
+                        email_candidates.extend(emails)
+                    if phones and not phone:
+                        phone = phones[0]
+                except Exception:
+                    pass
+            if found_profiles.get("linkedin"):
+                linkedin = found_profiles["linkedin"][0]
+            if found_profiles.get("instagram"):
+                instagram = found_profiles["instagram"][0]
+
+        # social discovery / guess
+        if instagram or linkedin:
+            social_links = {}
+            if instagram:
+                social_links["instagram"] = [instagram]
+            if linkedin:
+                social_links["linkedin"] = [linkedin]
+            social_info = self.social.run(social_links)
+        else:
+            social_info = self.social.discover_by_name(name)
+        return digital_info, email_candidates, phone, social_info
+
+    def _process_lead(self, b, city, language, io, llm, pages, business_type=None):
+        name = b.get("name") or "Unknown"
+        self._log(f"Processing: {name}")
+        website = b.get("website")
+
+        # competitor lookup does not depend on the website/social stages
+        competitor_f = io.submit(self.competitor.run, name, b.get("lat"), b.get("lng"),
+                                 radius_km=self.competitor_radius_km, business_type=business_type)
+        digital_info, email_candidates, phone, social_info = self._web_and_social(b, city, b.get("phone"), io, pages)
+
+        # attempt to extract email from social about fields if none found
+        if not email_candidates:
+            fb = social_info.get("facebook")
+            if isinstance(fb, dict):
+                about = fb.get("about","")
+                m = re.findall(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", str(about))
+                if m:
+                    email_candidates.extend(m)
+        final_email = email_candidates[0] if email_candidates else None
+
+        competitor_info = competitor_f.result()
+        aggregated = {"site_health": digital_info.get("health", {}), "social": social_info, "competitor": competitor_info}
+        # heuristic score only; the LLM explanation is batched later (see _explain_leads)
+        score = self.growth.score(aggregated)
+        findings = {"site_health": aggregated["site_health"], "social": aggregated["social"], "competitor": competitor_info, "score": score}
+
+        # build lead record (keep contact fields at top-level and inside meta)
+        lead = {
+            "name": name,
+            "address": b.get("address"),
+            "lat": b.get("lat"),
+            "lng": b.get("lng"),
+            "phone": phone,
+            "email": final_email,
+            "instagram": None,
+            "linkedin": None,
+            "website": website or (digital_info.get("website") if digital_info else None),
+            "city": city,
+            "type": business_type,
+            "meta": findings
+        }
+        # map social_info to fields
+        if social_info.get("instagram"):
+            ig = social_info.get("instagram")
+            if isinstance(ig, dict) and ig.get("username"):
+                lead["instagram"] = ig.get("username")
+            elif isinstance(ig, str):
+                # may be URL or dict
+                lead["instagram"] = ig
+        if social_info.get("linkedin"):
+            ln = social_info.get("linkedin")
+            if isinstance(ln, list):
+                lead["linkedin"] = ln[0]
+            elif isinstance(ln, str):
+                lead["linkedin"] = ln
+
+        # store contact fields inside meta for admin convenience; the pitch is filled in by _join_pitches
+        meta_to_save = lead["meta"]
+        meta_to_save.update({
+            "email": lead.get("email"),
+            "phone": lead.get("phone"),
+            "instagram": lead.get("instagram"),
+            "linkedin": lead.get("linkedin"),
+            "website": lead.get("website"),
+            "pitch": ""
+        })
+        lead["meta"] = meta_to_save
+        return lead
+
+    def _pitch_leads(self, leads, language, llm):
+        """
+        Submit one batched pitch job for every HIGH/MEDIUM lead to the LLM lane.
+        Returns (targets, future); future is None when no lead qualifies.
+        """
+        targets = [lead for lead in leads if lead["meta"]["score"]["grade"] in ["HIGH", "MEDIUM"]]
+        if not targets:
+            return targets, None
+        self._log(f"Generating {len(targets)} pitches (batch size {self.pitch_batch_size or model_registry.BATCH_SIZE})")
+        return targets, llm.submit(self.pitch.run_batch, [(lead, lead["meta"]) for lead in targets],
+                                   language=language, batch_size=self.pitch_batch_size)
+
+    def _join_pitches(self, targets, pitch_f):
+        """Wait for the pitch job, run compliance on each pitch and store it in meta."""
+        if pitch_f is None:
+            return
+        for lead, pitch in zip(targets, pitch_f.result()):
+            pitch_text = pitch.get("pitch", "")
+            comp = self.compliance.run(pitch_text)
+            if not comp.get("ok"):
+                self._log(f"Compliance issues: {comp.get('issues')}")
+                if "Missing unsubscribe/opt-out sentence" in comp.get("issues", []):
+                    pitch_text += "\n\nTo opt out, reply 'unsubscribe'."
+            lead["meta"]["pitch"] = pitch_text
+            lead["meta"]["pitch_template"] = pitch.get("template")
+
+    def _explain_leads(self, leads, llm):
+        """Submit one batched explanation job for all leads to the LLM lane; returns its future."""
+        items = [(lead["meta"], lead["meta"]["score"]) for lead in leads]
+        return llm.submit(self.growth.explain_batch, items, batch_size=self.pitch_batch_size)
+
+    def _join_explanations(self, leads, explain_f):
+        try:
+            explanations = explain_f.result()
+        except Exception as e:
+            self._log(f"Score explanations failed: {e}")
+            return False
+        for lead, text in zip(leads, explanations):
+            lead["meta"]["score"]["explanation"] = text
+        return True
+
+    def _persist(self, lead):
+        """Upsert one lead into the businesses table; returns its row id."""
+        obj, _ = upsert_business(self.db, {
+            "name": lead["name"],
+            "lat": lead["lat"],
+            "lng": lead["lng"],
+            "address": lead["address"],
+            "source": "composite",
+            "meta": lead["meta"],
+            # keep top-level contact fields too (upsert_business copies top-level into meta)
+            "email": lead.get("email"),
+            "phone": lead.get("phone"),
+            "instagram": lead.get("instagram"),
+            "linkedin": lead.get("linkedin"),
+            "website": lead.get("website"),
+            # stored so CompetitorAgent can filter by type
+            "city": lead.get("city"),
+            "type": lead.get("type")
+        })
+        return obj.id
+
+    def _persist_model_output(self, ids, leads, explained):
+        """Deferred mode: write only the pitch / explanation paths of meta, one batched update."""
+        updates = []
+        for bid, lead in zip(ids, leads):
+            fields = {"$.pitch": lead["meta"]["pitch"], "$.pitch_template": lead["meta"].get("pitch_template")}
+            if explained:
+                fields["$.score.explanation"] = lead["meta"]["score"]["explanation"]
+            updates.append((bid, fields))
+        update_meta(self.db, updates)
+
+    def run(self, business_type, city, limit=10, radius_km=5, language="en", concurrent=True):
+        """
+        Discover businesses and enrich/score/pitch each one.
+        concurrent=True processes leads in parallel: network stages go to a bounded I/O pool and
+        model work to a separate LLM lane. Leads get a heuristic score right away; pitches for all
+        HIGH/MEDIUM leads (PitchAgent.run_batch) and score explanations are then submitted as
+        batches to the LLM lane. With explain="deferred" the leads are saved without waiting for
+        either, and the pitch / explanation are written into meta afterwards in one batched
+        update; otherwise both are joined before the single save. Results keep discovery order.
+        """
+        # every website is downloaded and parsed once per run, shared by discovery and enrichment
+        pages = PageCache()
+        found = self.discovery.run(business_type, city, limit=limit, radius_km=radius_km, pages=pages)
+        if concurrent:
+            io = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="orch-io")
+            llm = ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix="orch-llm")
+            leads = ThreadPoolExecutor(max_workers=self.lead_workers, thread_name_prefix="orch-lead")
+        else:
+            io = llm = leads = _InlineExecutor()
+        try:
+            futures = [leads.submit(self._process_lead, b, city, language, io, llm, pages, business_type) for b in found]
+            results = [f.result() for f in futures]
+            # model work starts once all leads are scored, so the model sees whole batches
+            targets, pitch_f = self._pitch_leads(results, language, llm)
+            explain_f = self._explain_leads(results, llm) if results and self.explain != "off" else None
+            # the DB session is not thread-safe, so persist from this thread in discovery order
+            if self.explain == "deferred":
+                # pitches and explanations decode on the LLM lane while the leads are saved
+                ids = [self._persist(lead) for lead in results]
+                self._join_pitches(targets, pitch_f)
+                explained = explain_f is not None and self._join_explanations(results, explain_f)
+                if ids:
+                    self._persist_model_output(ids, results, explained)
             else:
-                social_info = self.social.discover_by_name(name)
-
-            # attempt to extract email from social about fields if none found
-            if not email_candidates:
-                fb = social_info.get("facebook")
-                if isinstance(fb, dict):
-                    about = fb.get("about","")
-                    import re
-                    m = re.findall(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", str(about))
-                    if m:
-                        email_candidates.extend(m)
-            final_email = email_candidates[0] if email_candidates else None
-
-            competitor_info = self.competitor.run(name, b.get("lat"), b.get("lng"))
-            aggregated = {"site_health": digital_info.get("health", {}), "social": social_info, "competitor": competitor_info}
-            score = self.growth.run(aggregated)
-            findings = {"site_health": aggregated["site_health"], "social": aggregated["social"], "competitor": competitor_info, "score": score}
-
-            # build lead record (keep contact fields at top-level and inside meta)
-            lead = {
-                "name": name,
-                "address": b.get("address"),
-                "lat": b.get("lat"),
-                "lng": b.get("lng"),
-                "phone": phone,
-                "email": final_email,
-                "instagram": None,
-                "linkedin": None,
-                "website": website or (digital_info.get("website") if digital_info else None),
-                "meta": findings
-            }
-            # map social_info to fields
-            if social_info.get("instagram"):
-                ig = social_info.get("instagram")
-                if isinstance(ig, dict) and ig.get("username"):
-                    lead["instagram"] = ig.get("username")
-                else:
-                    # may be URL or dict
-                    if isinstance(ig, str):
-                        lead["instagram"] = ig
-                    elif isinstance(ig, dict) and ig.get("username"):
-                        lead["instagram"] = ig.get("username")
-            if social_info.get("linkedin"):
-                ln = social_info.get("linkedin")
-                if isinstance(ln, list):
-                    lead["linkedin"] = ln[0]
-                elif isinstance(ln, str):
-                    lead["linkedin"] = ln
-
-            # generate pitch when needed
-            pitch_text = ""
-            if score["grade"] in ["HIGH", "MEDIUM"]:
-                pitch = self.pitch.run(lead, findings, language=language)
-                pitch_text = pitch.get("pitch", "")
-                comp = self.compliance.run(pitch_text)
-                if not comp.get("ok"):
-                    self._log(f"Compliance issues: {comp.get('issues')}")
-                    if "Missing unsubscribe/opt-out sentence" in comp.get("issues", []):
-                        pitch_text += "\n\nTo opt out, reply 'unsubscribe'."
-
-            # store contact fields inside meta for admin convenience
-            meta_to_save = lead["meta"]
-            meta_to_save.update({
-                "email": lead.get("email"),
-                "phone": lead.get("phone"),
-                "instagram": lead.get("instagram"),
-                "linkedin": lead.get("linkedin"),
-                "website": lead.get("website"),
-                "pitch": pitch_text
-            })
-            # attach pitch into meta and mark defaults for contact history
-            lead["meta"] = meta_to_save
-
-            # persist to DB (save_business ensures meta.contact_history etc)
-            save_business(self.db, {
-                "name": lead["name"],
-                "lat": lead["lat"],
-                "lng": lead["lng"],
-                "address": lead["address"],
-                "source": "composite",
-                "meta": lead["meta"],
-                # keep top-level contact fields too (save_business copies top-level into meta)
-                "email": lead.get("email"),
-                "phone": lead.get("phone"),
-                "instagram": lead.get("instagram"),
-                "linkedin": lead.get("linkedin"),
-                "website": lead.get("website")
-            })
-            results.append(lead)
-        return results
+                self._join_pitches(targets, pitch_f)
+                if explain_f is not None:
+                    self._join_explanations(results, explain_f)
+                for lead in results:
+                    self._persist(lead)
+            self._log(f"HTTP connection reuse: {http_client.stats_summary()}")
+            self._log(f"HTTP cache: {http_cache.stats()}")
+            self._log(f"Rate limiter: {rate_limiter.stats()}")
+            self._log(f"Models: {model_registry.stats()}")
+            self._log(f"Generation cache: {generation_cache.stats()}")
+            self._log(f"LLM worker (prompts remote/local): {llm_worker.stats()}")
+            return results
+        finally:
+            for pool in (leads, io, llm):
+                pool.shutdown(wait=True)
+
+    def close(self):
+        """Release the shared model references held by the LLM agents and the DB handles."""
+        self.growth.close()
+        self.pitch.close()
+        self.competitor.close()
+        self.db.close()
@@ -48,58 +48,67 @@
 
 # agents/pitch_agent.py
 from .base_agent import BaseAgent
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
+from .compliance_agent import ComplianceAgent
+from utils import generation_cache, llm_worker, model_registry, pitch_templates, translation
+import os
+import re
 import traceback
 
 MODEL_NAME = "google/flan-t5-small"
-# Translator model for English -> Hindi (Helsinki)
-TRANSLATOR_EN_HI = "Helsinki-NLP/opus-mt-en-hi"
+# Translator model for English -> Hindi (Helsinki); see utils/translation.py for other pairs
+TRANSLATOR_EN_HI = translation.TRANSLATORS[("en", "hi")]
+# "template": render utils/pitch_templates.py (no model call unless PITCH_PERSONALIZE=1)
+# "llm": generate the whole email with flan-t5
+PITCH_MODE = os.getenv("PITCH_MODE", "template").lower()
+PERSONALIZE = os.getenv("PITCH_PERSONALIZE", "").lower() in ("1", "true", "yes")
 
 class PitchAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, mode=None, personalize=None, template_version=None):
         super().__init__("PitchAgent")
-        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-        # translator lazy load
-        self.trans_tokenizer = None
-        self.trans_model = None
-        self.trans_device = self.device
+        self.mode = (mode or PITCH_MODE).lower()
+        self.personalize = PERSONALIZE if personalize is None else personalize
+        self.template_version = template_version or pitch_templates.DEFAULT_VERSION
+        self._compliance = ComplianceAgent()
+        # same instances as GrowthAgent (see utils/model_registry.py); loaded on first use
+        self.llm = model_registry.acquire(MODEL_NAME)
+
+    @property
+    def tokenizer(self):
+        return self.llm.tokenizer
+
+    @property
+    def model(self):
+        return self.llm.model
+
+    @property
+    def device(self):
+        return self.llm.device
+
+    def close(self):
+        self.llm.release()
 
     def _generate(self, prompt, max_new_tokens=128):
-        inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, padding=True).to(self.device)
-        out = self.model.generate(**inputs, max_new_tokens=max_new_tokens)
-        decoded = self.tokenizer.decode(out[0], skip_special_tokens=True)
-        return decoded
+        return self._generate_batch([prompt], max_new_tokens=max_new_tokens)[0]
 
-    def _ensure_translator(self, en_to="hi"):
-        """
-        Lazy load translator for en->hi only (expandable later).
-        """
-        if self.trans_model is None:
-            if en_to == "hi":
-                self.trans_tokenizer = AutoTokenizer.from_pretrained(TRANSLATOR_EN_HI)
-                self.trans_model = AutoModelForSeq2SeqLM.from_pretrained(TRANSLATOR_EN_HI).to(self.trans_device)
+    def _generate_batch(self, prompts, max_new_tokens=128, batch_size=None):
+        # cache hits never reach the model (see utils/generation_cache.py)
+        return generation_cache.generate(
+            self.llm.cache_id, {"max_new_tokens": max_new_tokens}, prompts,
+            lambda todo: llm_worker.generate(self.llm, todo, max_new_tokens=max_new_tokens, batch_size=batch_size))
 
-    def _translate_en_to_hi(self, text):
+    def _translate(self, texts, language, batch_size=None):
+        """Sentence-level batched translation from English; returns the input on failure."""
         try:
-            self._ensure_translator("hi")
-            inputs = self.trans_tokenizer(text, return_tensors="pt", truncation=True, padding=True).to(self.trans_device)
-            out = self.trans_model.generate(**inputs, max_new_tokens=256)
-            decoded = self.trans_tokenizer.decode(out[0], skip_special_tokens=True)
-            return decoded
+            return translation.translate_batch(texts, "en", language, batch_size=batch_size)
         except Exception:
             self._log("Translation failed: " + traceback.format_exc())
-            return text
+            return texts
 
-    def run(self, business, findings, language="en"):
-        """
-        business: {"name":..., "address":...}
-        findings: aggregated dict, must include explicit 'issues' list or fields used to craft pitch.
-        language: 'en' or 'hi' for Hindi (others not implemented)
-        """
+    def _translate_en_to_hi(self, text):
+        return self._translate([text], "hi")[0]
+
+    @staticmethod
+    def _build_prompt(business, findings):
         name = business.get("name", "Business")
         issues = []
         if findings.get("site_health", {}).get("issues"):
@@ -113,18 +122,68 @@ class PitchAgent(BaseAgent):
             if isinstance(fb, dict) and fb.get("followers") and isinstance(fb.get("followers"), int) and fb.get("followers") < 200:
                 issues.append(f"Low Facebook followers: {fb['followers']}")
         # craft prompt for LLM (English)
-        prompt = (
+        return (
             f"Write a short professional outreach email (3-5 sentences) to {name}. "
             f"Use the following verified observations: {issues}. "
             "Offer a concise value proposition for improving web presence and social engagement. "
             "Include a single-line call-to-action and an unsubscribe sentence. Tone: friendly, professional."
         )
-        pitch_en = self._generate(prompt, max_new_tokens=120)
-        pitch_final = pitch_en
+
+    @staticmethod
+    def _personal_prompt(business):
+        where = f" in {business['address']}" if business.get("address") else ""
+        return (
+            f"Write one short, friendly opening sentence for an email to {business.get('name', 'a local business')}{where}. "
+            "Mention something specific to this kind of business. Do not mention prices or offers."
+        )
+
+    def _clean_personal(self, text):
+        """Keep the first sentence of a personalization line; drop it when it would fail compliance."""
+        text = re.split(r"(?<=[.!?])\s", (text or "").strip(), maxsplit=1)[0].strip()
+        lower = text.lower()
+        if not text or len(text) > 200 or any(kw in lower for kw in self._compliance.spam_keywords):
+            return None
+        return text
+
+    def _render_batch(self, items, batch_size=None):
+        personal = [None] * len(items)
+        if self.personalize:
+            prompts = [self._personal_prompt(business) for business, _ in items]
+            lines = self._generate_batch(prompts, max_new_tokens=40, batch_size=batch_size)
+            personal = [self._clean_personal(line) for line in lines]
+        return [pitch_templates.render(business.get("name"), findings, personal=p, version=self.template_version)
+                for (business, findings), p in zip(items, personal)]
+
+    def _localize(self, pitches_en, language, batch_size=None):
         if language and language.lower() != "en":
-            if language.lower() == "hi":
-                self._log("Translating pitch to Hindi")
-                pitch_final = self._translate_en_to_hi(pitch_en)
-            else:
-                self._log(f"Requested language '{language}' not supported, returning English.")
-        return {"pitch": pitch_final, "lang": language}
+            if translation.supports("en", language):
+                self._log(f"Translating {len(pitches_en)} pitch(es) to '{language}'")
+                return self._translate(pitches_en, language.lower(), batch_size=batch_size)
+            self._log(f"Requested language '{language}' not supported, returning English.")
+        return pitches_en
+
+    def run(self, business, findings, language="en"):
+        """
+        business: {"name":..., "address":...}
+        findings: aggregated dict, must include explicit 'issues' list or fields used to craft pitch.
+        language: 'en', or a target with a translator in utils/translation.py ('hi' for Hindi)
+        """
+        return self.run_batch([(business, findings)], language=language)[0]
+
+    def run_batch(self, items, language="en", batch_size=None):
+        """
+        Pitch many leads at once. items: [(business, findings), ...]; returns one
+        {"pitch", "lang", "template"} per item, in order ("template" is the template version,
+        None in llm mode). Model calls (llm mode, or personalization lines) run in length-bucketed,
+        padded batches of `batch_size` (default LLM_BATCH_SIZE); translations are batched by
+        sentence across all pitches.
+        """
+        template = None
+        if self.mode == "template":
+            template = self.template_version
+            pitches = self._render_batch(items, batch_size=batch_size)
+        else:
+            prompts = [self._build_prompt(business, findings) for business, findings in items]
+            pitches = self._generate_batch(prompts, max_new_tokens=120, batch_size=batch_size)
+        pitches = self._localize(pitches, language, batch_size=batch_size)
+        return [{"pitch": p, "lang": language, "template": template} for p in pitches]
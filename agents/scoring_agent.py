@@ -0,0 +1,143 @@
+# agents/scoring_agent.py
+"""
+Bulk re-scoring of every stored lead with the current SCORING_WEIGHTS (agents/growth_agent.py).
+The signals GrowthAgent.score() reads are pulled out of the meta JSON by SQLite (json_extract)
+into numpy columns. The whole table is scored in one vectorized pass, and only rows whose
+score or grade changed are written back, in a single transaction. The LLM explanation of a
+changed row is cleared because it describes the old score.
+With competitors="grid" the competitor counts come from the precomputed density grids
+(db/density.py) instead of the stored meta.competitor, so no lead needs a lookup of its own.
+"""
+import time
+import numpy as np
+from .base_agent import BaseAgent
+from .growth_agent import SCORING_WEIGHTS
+from db import density
+from db.helpers import get_connection
+from db.setup_db import migrate
+
+GRADES = np.array(["LOW", "MEDIUM", "HIGH"])
+
+# missing signals count as 0, like the .get(..., 0) defaults in GrowthAgent.score()
+_LOAD_SQL = """
+SELECT id,
+       COALESCE(CAST(json_extract(meta, '$.site_health.score') AS REAL), 0),
+       COALESCE(CAST(json_extract(meta, '$.social.facebook.followers') AS REAL), 0),
+       COALESCE(CAST(json_extract(meta, '$.social.instagram.followers') AS REAL), 0),
+       COALESCE(json_type(meta, '$.social.twitter') = 'object', 0),
+       COALESCE(CAST(json_extract(meta, '$.social.twitter.avg_likes') AS REAL), 0),
+       COALESCE(CAST(json_extract(meta, '$.competitor.competitor_count') AS REAL), 0),
+       CAST(json_extract(meta, '$.score.opportunity_score') AS REAL),
+       CASE json_extract(meta, '$.score.grade') WHEN 'LOW' THEN 0 WHEN 'MEDIUM' THEN 1 WHEN 'HIGH' THEN 2 ELSE -1 END
+FROM businesses
+WHERE json_valid(meta)
+ORDER BY id
+"""
+
+_PLACE_SQL = """
+SELECT city, type, lat, lng
+FROM businesses
+WHERE json_valid(meta)
+ORDER BY id
+"""
+
+_WRITE_SQL = """
+UPDATE businesses
+SET meta = json_set(meta, '$.score.opportunity_score', ?, '$.score.grade', ?, '$.score.explanation', NULL)
+WHERE id = ?
+"""
+
+_WRITE_WITH_COMPETITORS_SQL = """
+UPDATE businesses
+SET meta = json_set(meta, '$.score.opportunity_score', ?, '$.score.grade', ?, '$.score.explanation', NULL,
+                    '$.competitor.competitor_count', ?)
+WHERE id = ?
+"""
+
+
+def score_arrays(site, fb_followers, ig_followers, has_twitter, tw_likes, competitors, weights=None):
+    """Vectorized GrowthAgent.score(): returns (opportunity float array, grade index array into GRADES)."""
+    w = {**SCORING_WEIGHTS, **(weights or {})}
+    social = (np.minimum(w["facebook_cap"], fb_followers / w["facebook_per_point"])
+              + np.minimum(w["instagram_cap"], ig_followers / w["instagram_per_point"])
+              + np.where(has_twitter > 0, np.minimum(w["twitter_cap"], tw_likes / w["twitter_per_point"]), 0.0))
+    opportunity = (100 - (site * w["site"] + social * w["social"])
+                   + np.maximum(0, w["competitor_baseline"] - competitors) * w["competitor_bonus"])
+    opportunity = np.clip(opportunity, 0, 100)
+    grade = np.where(opportunity > w["high"], 2, np.where(opportunity > w["medium"], 1, 0))
+    return opportunity, grade
+
+
+def grid_competitors(conn, stored, radius_km=2.0):
+    """
+    Competitor counts within radius_km from the density grids for every row of _LOAD_SQL (same
+    order), estimated over the same disc as CompetitorAgent's exact count; rows without
+    coordinates, city/type or a grid keep their `stored` count.
+    """
+    places = conn.execute(_PLACE_SQL).fetchall()
+    out = stored.copy()
+    groups = {}
+    for i, (city, type_, lat, lng) in enumerate(places):
+        if city and type_ and lat is not None and lng is not None:
+            groups.setdefault((density.norm(city), density.norm(type_)), []).append((i, lat, lng))
+    for key, rows in groups.items():
+        g = density.get_grid(*key, conn=conn)
+        if g is None:
+            continue
+        arr = np.array(rows, dtype=np.float64)
+        # the grid includes the lead itself
+        out[arr[:, 0].astype(np.int64)] = np.maximum(0, np.rint(g.count_near(arr[:, 1], arr[:, 2], radius_km)) - 1)
+    return out
+
+
+class ScoringAgent(BaseAgent):
+    def __init__(self):
+        super().__init__("ScoringAgent")
+
+    def run(self, weights=None, dry_run=False, competitors="stored", radius_km=2.0):
+        """
+        Re-score all leads. weights: overrides merged over SCORING_WEIGHTS.
+        competitors: "stored" (meta.competitor.competitor_count) or "grid" (density grids, the
+        new counts are written back too).
+        Returns {"rows", "changed", "grades": {grade: count}, "load_s", "score_s", "write_s"}.
+        """
+        conn = get_connection()
+        try:
+            migrate(conn)
+            t0 = time.perf_counter()
+            rows = conn.execute(_LOAD_SQL).fetchall()
+            data = np.array(rows, dtype=np.float64).reshape(-1, 9)
+            stored_competitors = data[:, 6]
+            comp = grid_competitors(conn, stored_competitors, radius_km) if competitors == "grid" else stored_competitors
+            t1 = time.perf_counter()
+            ids = data[:, 0].astype(np.int64)
+            opportunity, grade = score_arrays(*data[:, 1:6].T, comp, weights=weights)
+            old_score, old_grade = data[:, 7], data[:, 8]
+            changed = (np.isnan(old_score) | (np.abs(opportunity - old_score) > 1e-9) | (grade != old_grade)
+                       | (comp != stored_competitors))
+            idx = np.flatnonzero(changed)
+            t2 = time.perf_counter()
+            if not dry_run and len(idx):
+                with conn:
+                    if competitors == "grid":
+                        conn.executemany(_WRITE_WITH_COMPETITORS_SQL, zip(
+                            opportunity[idx].tolist(), GRADES[grade[idx]].tolist(),
+                            comp[idx].astype(np.int64).tolist(), ids[idx].tolist()))
+                    else:
+                        conn.executemany(_WRITE_SQL, zip(opportunity[idx].tolist(), GRADES[grade[idx]].tolist(),
+                                                         ids[idx].tolist()))
+            t3 = time.perf_counter()
+        finally:
+            conn.close()
+        counts = np.bincount(grade, minlength=3)
+        out = {
+            "rows": len(ids),
+            "changed": int(len(idx)),
+            "grades": {str(g): int(n) for g, n in zip(GRADES, counts)},
+            "load_s": round(t1 - t0, 2),
+            "score_s": round(t2 - t1, 3),
+            "write_s": round(t3 - t2, 2),
+            "dry_run": dry_run,
+        }
+        self._log(f"Re-scored {out['rows']} leads, {out['changed']} changed: {out}")
+        return out
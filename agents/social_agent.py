@@ -3,7 +3,6 @@ from .base_agent import BaseAgent
 from services.social_tools import get_facebook_metrics, get_instagram_profile_metrics, get_twitter_metrics
 from urllib.parse import urlparse
 import re
-import time
 
 class SocialAgent(BaseAgent):
     def __init__(self):
@@ -95,8 +94,8 @@ class SocialAgent(BaseAgent):
                         results["instagram"] = ig
                         self._log(f"Found instagram: {candidate}")
                 except Exception as e:
-                    # be polite and short delay to avoid rapid firing
-                    time.sleep(0.3)
+                    # pacing is handled per host by services.rate_limiter
+                    pass
             # facebook
             if try_facebook and "facebook" not in results:
                 try:
@@ -106,7 +105,7 @@ class SocialAgent(BaseAgent):
                         results["facebook"] = fb
                         self._log(f"Found facebook: {candidate}")
                 except Exception as e:
-                    time.sleep(0.3)
+                    pass
             # twitter
             if try_twitter and "twitter" not in results:
                 try:
@@ -116,7 +115,7 @@ class SocialAgent(BaseAgent):
                         results["twitter"] = tw
                         self._log(f"Found twitter: {candidate}")
                 except Exception as e:
-                    time.sleep(0.3)
+                    pass
             # stop early if found some profiles
             if results:
                 # keep attempting a bit to gather multiple profiles
@@ -1,119 +1,191 @@
 # db/crud.py
+import json
 from datetime import datetime
-from db.helpers import get_connection
+from db.helpers import dedup_key, dedup_prefix, get_connection, same_place
+from db.setup_db import migrate
+from db import density
 
 def now_iso():
     return datetime.utcnow().isoformat()
 
-def _normalize_text(s):
-    if s is None:
-        return None
-    return str(s).strip()
+FIELDS = ["name", "address", "lat", "lng", "phone", "email", "website", "instagram", "linkedin",
+          "city", "type", "source"]
+
+BATCH_SIZE = 500
+# keeps the IN (...) lookups under SQLite's bound-parameter limit
+_MAX_VARS = 900
+
+# one statement per lead: the UNIQUE dedup_key index finds the duplicate, and None means
+# "keep the stored value" (meta arrives already merged, see _merged_meta)
+_UPSERT_SQL = ("INSERT INTO businesses (" + ",".join(FIELDS) + ",meta,last_updated,dedup_key) VALUES ("
+               + ",".join("?" * (len(FIELDS) + 3)) + ") ON CONFLICT(dedup_key) DO UPDATE SET "
+               + ", ".join(f"{k} = COALESCE(excluded.{k}, {k})" for k in FIELDS)
+               + ", meta = COALESCE(excluded.meta, meta), last_updated = excluded.last_updated")
+
+# stored rows of one business (same name|address prefix), one range probe on the dedup_key index;
+# "}" follows "|" so the range ends right after the prefix
+_CANDIDATES_SQL = "SELECT dedup_key, lat, lng FROM businesses WHERE dedup_key >= ? AND dedup_key < ?"
+
+def lead_key(lead):
+    return dedup_key(lead.get("name"), lead.get("address"), lead.get("lat"), lead.get("lng"))
 
-def find_existing(conn, name, address):
+def resolve_keys(conn, leads):
     """
-    Return existing row id if a likely duplicate exists (match name exactly and address substring).
+    dedup_key each lead should upsert under. A stored row (or an earlier lead of the same batch)
+    with the same name|address that is a same_place() match keeps its key, so points across a
+    geocell edge, or one lead seen with and without coordinates, stay a single row. Otherwise the
+    lead's own dedup_key is used.
     """
-    name = _normalize_text(name) or ""
-    address = _normalize_text(address) or ""
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, address FROM businesses WHERE name = ?", (name,))
-    rows = cur.fetchall()
-    for r in rows:
-        rid, rname, raddr = r
-        if raddr and address:
-            if address.split(",")[0].strip().lower() in raddr.lower():
-                return rid
-    if rows:
-        return rows[0][0]
-    return None
+    candidates = {}
+    keys = []
+    for lead in leads:
+        lat, lng = lead.get("lat"), lead.get("lng")
+        prefix = dedup_prefix(lead.get("name"), lead.get("address"))
+        rows = candidates.get(prefix)
+        if rows is None:
+            rows = candidates[prefix] = conn.execute(_CANDIDATES_SQL, (prefix, prefix[:-1] + "}")).fetchall()
+        key = next((k for k, rlat, rlng in rows if same_place(lat, lng, rlat, rlng)), None)
+        if key is None:
+            key = lead_key(lead)
+            rows.append((key, lat, lng))
+        keys.append(key)
+    return keys
 
-def upsert_business(lead: dict):
+def find_existing(conn, name, address, lat=None, lng=None):
     """
-    Insert or update a business lead.
-    lead keys: name,address,lat,lng,phone,email,website,instagram,linkedin,city,type,source
-    Returns (id, created_bool)
+    Return existing row id if a duplicate exists (same normalized name and first address segment,
+    within one geocell or without coordinates on either side).
+    """
+    key = resolve_keys(conn, [{"name": name, "address": address, "lat": lat, "lng": lng}])[0]
+    row = conn.execute("SELECT id FROM businesses WHERE dedup_key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _by_key(conn, keys, col):
+    out = {}
+    keys = list(keys)
+    for i in range(0, len(keys), _MAX_VARS):
+        chunk = keys[i:i + _MAX_VARS]
+        sql = f"SELECT dedup_key, {col} FROM businesses WHERE dedup_key IN ({','.join('?' * len(chunk))})"
+        out.update(conn.execute(sql, chunk))
+    return out
+
+def _ids_by_key(conn, keys):
+    return _by_key(conn, keys, "id")
+
+def _merged_meta(conn, leads, keys):
+    # a lead's meta dict replaces the stored meta key by key (JSON text; None keeps the stored meta)
+    if not any(l.get("meta") is not None for l in leads):
+        return [None] * len(leads)
+    current = {k: json.loads(v) if v else {} for k, v in _by_key(conn, set(keys), "meta").items()}
+    out = []
+    for lead, key in zip(leads, keys):
+        if lead.get("meta") is None:
+            out.append(None)
+            continue
+        current[key] = {**(current.get(key) or {}), **lead["meta"]}
+        out.append(json.dumps(current[key]))
+    return out
+
+def upsert_rows(conn, leads):
+    """
+    Upsert leads (same keys as upsert_business, plus an optional "meta" dict) inside the caller's
+    write transaction, which should be BEGIN IMMEDIATE so the duplicate probe and the write
+    cannot race. Returns [(id, created_bool), ...] in input order; pass them to note_created
+    after committing.
+    """
+    now = now_iso()
+    keys = resolve_keys(conn, leads)
+    existing = _ids_by_key(conn, set(keys))
+    metas = _merged_meta(conn, leads, keys)
+    conn.executemany(_UPSERT_SQL, [[l.get(k) for k in FIELDS] + [m, now, key]
+                                   for l, m, key in zip(leads, metas, keys)])
+    new_keys = set(keys) - existing.keys()
+    ids = {**existing, **_ids_by_key(conn, new_keys)}
+    results = []
+    for key in keys:
+        # a repeat of a new lead within the batch was an ON CONFLICT update of the first one
+        is_new = key in new_keys
+        new_keys.discard(key)
+        results.append((ids[key], is_new))
+    return results
+
+def note_created(conn, leads, results):
+    # keep the (city, type) density grids current without a rebuild; commits on conn
+    created = [l for l, (_, is_new) in zip(leads, results) if is_new]
+    if created:
+        density.note_inserts(conn, [(l.get("city"), l.get("type"), l.get("lat"), l.get("lng")) for l in created])
+
+def _upsert_batch(conn, leads):
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        results = upsert_rows(conn, leads)
+    note_created(conn, leads, results)
+    return results
+
+def bulk_upsert_businesses(leads, batch_size=BATCH_SIZE):
+    """
+    Insert or update many leads (same keys as upsert_business) on one connection.
+    Each batch is one executemany of INSERT ... ON CONFLICT(dedup_key) DO UPDATE in a single
+    transaction. Returns [(id, created_bool), ...] in input order.
     """
     conn = get_connection()
+    migrate(conn)
+    conn.isolation_level = None  # transactions are opened explicitly per batch
     try:
-        existing_id = find_existing(conn, lead.get("name"), lead.get("address"))
-        cur = conn.cursor()
-        now = now_iso()
-        if existing_id:
-            fields = {
-                "name": lead.get("name"),
-                "address": lead.get("address"),
-                "lat": lead.get("lat"),
-                "lng": lead.get("lng"),
-                "phone": lead.get("phone"),
-                "email": lead.get("email"),
-                "website": lead.get("website"),
-                "instagram": lead.get("instagram"),
-                "linkedin": lead.get("linkedin"),
-                "city": lead.get("city"),
-                "type": lead.get("type"),
-                "source": lead.get("source"),
-                "last_updated": now
-            }
-            set_parts = []
-            params = []
-            for k, v in fields.items():
-                if v is not None:
-                    set_parts.append(f"{k} = ?")
-                    params.append(v)
-            params.append(existing_id)
-            if set_parts:
-                sql = "UPDATE businesses SET " + ", ".join(set_parts) + " WHERE id = ?"
-                cur.execute(sql, tuple(params))
-                conn.commit()
-            return existing_id, False
-        else:
-            sql = """
-            INSERT INTO businesses
-            (name,address,lat,lng,phone,email,website,instagram,linkedin,city,type,source,last_updated)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """
-            params = (
-                lead.get("name"),
-                lead.get("address"),
-                lead.get("lat"),
-                lead.get("lng"),
-                lead.get("phone"),
-                lead.get("email"),
-                lead.get("website"),
-                lead.get("instagram"),
-                lead.get("linkedin"),
-                lead.get("city"),
-                lead.get("type"),
-                lead.get("source"),
-                now
-            )
-            cur.execute(sql, params)
-            conn.commit()
-            return cur.lastrowid, True
+        results, batch = [], []
+        for lead in leads:
+            batch.append(lead)
+            if len(batch) >= batch_size:
+                results += _upsert_batch(conn, batch)
+                batch = []
+        if batch:
+            results += _upsert_batch(conn, batch)
+        return results
     finally:
         conn.close()
 
-def fetch_all(filters: dict = None):
-    conn = get_connection()
-    cur = conn.cursor()
+def upsert_business(lead: dict):
+    """
+    Insert or update a business lead.
+    lead keys: name,address,lat,lng,phone,email,website,instagram,linkedin,city,type,source[,meta]
+    Returns (id, created_bool)
+    """
+    return bulk_upsert_businesses([lead])[0]
+
+def _prefix(s):
+    # LIKE pattern for "starts with s"; wildcards typed by the user match literally
+    return str(s).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def fetch_all_sql(filters: dict = None):
+    """
+    SQL and params for fetch_all. city / type are exact matches and *_prefix are case-insensitive
+    prefixes; both use indexes (db/setup_db.py migration 6). *_contains is a leading-wildcard
+    LIKE and always scans the table.
+    """
     sql = "SELECT * FROM businesses"
     where = []
     params = []
     if filters:
-        if "name_contains" in filters:
-            where.append("name LIKE ?")
-            params.append(f"%{filters['name_contains']}%")
-        if "city_contains" in filters:
-            where.append("city LIKE ?")
-            params.append(f"%{filters['city_contains']}%")
-        if "type_contains" in filters:
-            where.append("type LIKE ?")
-            params.append(f"%{filters['type_contains']}%")
+        for col in ("city", "type"):
+            if col in filters:
+                where.append(f"{col} = ?")
+                params.append(filters[col])
+        for col in ("name", "city", "type"):
+            if f"{col}_prefix" in filters:
+                where.append(f"{col} LIKE ? ESCAPE '\\'")
+                params.append(_prefix(filters[f"{col}_prefix"]))
+            if f"{col}_contains" in filters:
+                where.append(f"{col} LIKE ?")
+                params.append(f"%{filters[f'{col}_contains']}%")
     if where:
         sql += " WHERE " + " AND ".join(where)
     sql += " ORDER BY last_updated DESC"
-    cur.execute(sql, tuple(params))
+    return sql, tuple(params)
+
+def fetch_all(filters: dict = None):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(*fetch_all_sql(filters))
     cols = [c[0] for c in cur.description]
     rows = [dict(zip(cols, r)) for r in cur.fetchall()]
     conn.close()
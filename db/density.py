@@ -0,0 +1,221 @@
+# db/density.py
+"""
+Precomputed competitor-density grids per (city, type).
+One pass over `businesses` buckets every geocoded row of a (city, type) pair into square cells
+of DENSITY_CELL_M metres. The counts are stored as a compact uint32 array (table `density_grids`,
+migration 4 in db/setup_db.py). count_near() estimates the businesses within a radius from the
+cells around a point, each weighted by its share of the disc, for one point or a numpy array.
+upsert_business (db/crud.py, utils/db.py) calls note_insert() so grids follow new rows
+without a rebuild. A point outside a grid's bounds rebuilds just that pair, and the first
+insert of a new pair builds its grid.
+"""
+import math
+import os
+import threading
+import time
+import numpy as np
+from db.helpers import get_connection
+from db.setup_db import migrate
+from utils.spatial import M_PER_DEG_LAT
+
+CELL_M = float(os.getenv("DENSITY_CELL_M", "500"))
+
+_lock = threading.Lock()
+_grids = {}  # (city, type) -> DensityGrid, loaded on demand
+
+
+def norm(s):
+    return " ".join((s or "").lower().split())
+
+
+class DensityGrid:
+    def __init__(self, city, type_, cell_m, min_lat, min_lng, lat_step, lng_step, counts):
+        self.city = city
+        self.type = type_
+        self.cell_m = cell_m
+        self.min_lat = min_lat
+        self.min_lng = min_lng
+        self.lat_step = lat_step
+        self.lng_step = lng_step
+        self.counts = counts  # (rows, cols) uint32
+
+    @classmethod
+    def from_points(cls, city, type_, lats, lngs, cell_m=CELL_M):
+        lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+        lat_step = cell_m / M_PER_DEG_LAT
+        # one longitude step for the whole grid, taken at its middle latitude
+        lng_step = lat_step / max(0.01, math.cos(math.radians((lats.min() + lats.max()) / 2)))
+        g = cls(city, type_, cell_m, float(lats.min()), float(lngs.min()), lat_step, lng_step, None)
+        rows = int((lats.max() - g.min_lat) // lat_step) + 1
+        cols = int((lngs.max() - g.min_lng) // lng_step) + 1
+        r, c = g._cells(lats, lngs)
+        g.counts = np.bincount(r * cols + c, minlength=rows * cols).astype(np.uint32).reshape(rows, cols)
+        return g
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def _cells(self, lats, lngs):
+        r = np.floor((np.asarray(lats) - self.min_lat) / self.lat_step).astype(np.int64)
+        c = np.floor((np.asarray(lngs) - self.min_lng) / self.lng_step).astype(np.int64)
+        return r, c
+
+    def contains(self, lats, lngs):
+        """True if every point falls inside the grid."""
+        r, c = self._cells(lats, lngs)
+        return bool(np.all((r >= 0) & (r < self.shape[0]) & (c >= 0) & (c < self.shape[1])))
+
+    def add(self, lats, lngs, n=1):
+        r, c = self._cells(lats, lngs)
+        np.add.at(self.counts, (r, c), n)
+
+    def count_near(self, lats, lngs, radius_km=2.0, chunk=20000):
+        """
+        Estimated businesses within radius_km of each point (array in, array out; scalars work
+        too). Every cell around the point counts with the share of its area inside the circle,
+        taken from the distance between the point and the cell centre, so the estimate follows
+        the same 2 km disc as CompetitorAgent's exact count. Cells outside the grid count as empty.
+        """
+        scalar = np.ndim(lats) == 0
+        lats, lngs = np.atleast_1d(np.asarray(lats, dtype=np.float64)), np.atleast_1d(np.asarray(lngs, dtype=np.float64))
+        radius_m = radius_km * 1000
+        k = max(1, math.ceil(radius_m / self.cell_m))
+        dr, dc = np.mgrid[-k:k + 1, -k:k + 1]
+        dr, dc = dr.ravel(), dc.ravel()
+        # a circle of the cell's area has radius h; the share inside the disc ramps over d = R -/+ h
+        h = self.cell_m / math.sqrt(math.pi)
+        rows, cols = self.shape
+        out = np.empty(len(lats))
+        for i in range(0, len(lats), chunk):
+            # positions in cell units from the grid origin
+            y = (lats[i:i + chunk] - self.min_lat) / self.lat_step
+            x = (lngs[i:i + chunk] - self.min_lng) / self.lng_step
+            r = np.floor(y).astype(np.int64)[:, None] + dr
+            c = np.floor(x).astype(np.int64)[:, None] + dc
+            d = np.hypot(r + 0.5 - y[:, None], c + 0.5 - x[:, None]) * self.cell_m
+            w = np.clip((radius_m + h - d) / (2 * h), 0.0, 1.0)
+            inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+            counts = np.where(inside, self.counts[np.clip(r, 0, rows - 1), np.clip(c, 0, cols - 1)], 0)
+            out[i:i + chunk] = (w * counts).sum(axis=1)
+        return out[0] if scalar else out
+
+
+def _save(conn, g):
+    rows, cols = g.shape
+    conn.execute(
+        "INSERT OR REPLACE INTO density_grids VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+        (g.city, g.type, g.cell_m, g.min_lat, g.min_lng, g.lat_step, g.lng_step, rows, cols,
+         g.counts.astype("<u4").tobytes(), g.total, time.time()))
+
+
+def _load(conn, city, type_):
+    row = conn.execute(
+        "SELECT cell_m, min_lat, min_lng, lat_step, lng_step, rows, cols, counts FROM density_grids "
+        "WHERE city = ? AND type = ?", (city, type_)).fetchone()
+    if row is None:
+        return None
+    cell_m, min_lat, min_lng, lat_step, lng_step, rows, cols, blob = row
+    counts = np.frombuffer(blob, dtype="<u4").astype(np.uint32).reshape(rows, cols)
+    return DensityGrid(city, type_, cell_m, min_lat, min_lng, lat_step, lng_step, counts)
+
+
+def build(conn=None, city=None, type_=None, cell_m=CELL_M):
+    """
+    (Re)build grids from `businesses` in one pass; all pairs, or only those matching city/type.
+    Returns {(city, type): cells_with_businesses}.
+    """
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+        migrate(conn)
+        sql = ("SELECT lower(trim(city)), lower(trim(type)), lat, lng FROM businesses "
+               "WHERE lat IS NOT NULL AND lng IS NOT NULL AND city IS NOT NULL AND type IS NOT NULL")
+        params = []
+        if city is not None:
+            sql += " AND lower(trim(city)) = ?"
+            params.append(norm(city))
+        if type_ is not None:
+            sql += " AND lower(trim(type)) = ?"
+            params.append(norm(type_))
+        rows = conn.execute(sql + " ORDER BY 1, 2", params).fetchall()
+        groups = {}
+        for c, t, lat, lng in rows:
+            groups.setdefault((norm(c), norm(t)), []).append((lat, lng))
+        built = {}
+        with conn:
+            for (c, t), pts in groups.items():
+                arr = np.array(pts, dtype=np.float64)
+                g = DensityGrid.from_points(c, t, arr[:, 0], arr[:, 1], cell_m)
+                _save(conn, g)
+                built[(c, t)] = int(np.count_nonzero(g.counts))
+                with _lock:
+                    _grids[(c, t)] = g
+        return built
+    finally:
+        if own:
+            conn.close()
+
+
+def get_grid(city, type_, conn=None):
+    """The grid for (city, type) or None; cached in-process after the first load."""
+    key = (norm(city), norm(type_))
+    with _lock:
+        g = _grids.get(key)
+    if g is not None:
+        return g
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+        migrate(conn)
+        g = _load(conn, *key)
+    finally:
+        if own:
+            conn.close()
+    if g is not None:
+        with _lock:
+            g = _grids.setdefault(key, g)
+    return g
+
+
+def count_near(city, type_, lat, lng, radius_km=2.0):
+    """Density lookup (estimated count within radius_km); None when no grid exists for the pair."""
+    g = get_grid(city, type_)
+    return None if g is None else int(round(g.count_near(lat, lng, radius_km)))
+
+
+def note_inserts(conn, points):
+    """
+    Incremental refresh after new rows: points is [(city, type, lat, lng), ...] (already stored).
+    Grids that exist are updated in place; a point outside its grid rebuilds that pair, and a
+    pair without a grid yet gets one built (from the stored rows, which include these points).
+    """
+    by_pair = {}
+    for city, type_, lat, lng in points:
+        if lat is not None and lng is not None and city and type_:
+            by_pair.setdefault((norm(city), norm(type_)), []).append((lat, lng))
+    touched, rebuild = [], []
+    for key, pts in by_pair.items():
+        g = get_grid(*key, conn=conn)
+        if g is None:
+            rebuild.append((key, CELL_M))
+            continue
+        arr = np.array(pts, dtype=np.float64)
+        if g.contains(arr[:, 0], arr[:, 1]):
+            g.add(arr[:, 0], arr[:, 1])
+            touched.append(g)
+        else:
+            rebuild.append((key, g.cell_m))
+    with conn:
+        for g in touched:
+            _save(conn, g)
+    for key, cell_m in rebuild:
+        build(conn, *key, cell_m=cell_m)
+
+
+def note_insert(conn, city, type_, lat, lng):
+    note_inserts(conn, [(city, type_, lat, lng)])
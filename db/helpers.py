@@ -10,6 +10,7 @@
 
 
 # db/helpers.py
+import math
 import sqlite3
 import os
 
@@ -27,3 +28,41 @@ def get_connection():
     from the same process for demo purposes.
     """
     return sqlite3.connect(DB_PATH, check_same_thread=False)
+
+# Coarse geocell for dedup keys, in degrees (0.01 deg is about 1.1 km)
+DEDUP_CELL_DEG = float(os.getenv("DEDUP_CELL_DEG", "0.01"))
+
+def _norm(s):
+    return " ".join(str(s or "").lower().split())
+
+def dedup_prefix(name, address=None):
+    """name | first address segment | -- every dedup_key of this business starts with it."""
+    return f"{_norm(name)}|{_norm((address or '').split(',')[0])}|"
+
+def dedup_key(name, address=None, lat=None, lng=None):
+    """
+    Normalized identity of a business: name | first address segment | geocell.
+    Stored in businesses.dedup_key (UNIQUE), so duplicate checks are a single index probe.
+    The geocell only keys new rows; matching goes through db.crud.resolve_keys, which also
+    accepts a stored row one cell away or without coordinates.
+    """
+    cell = ""
+    if lat is not None and lng is not None:
+        cell = f"{math.floor(float(lat) / DEDUP_CELL_DEG)}:{math.floor(float(lng) / DEDUP_CELL_DEG)}"
+    return dedup_prefix(name, address) + cell
+
+def same_place(lat1, lng1, lat2, lng2):
+    """Dedup tolerance: within one DEDUP_CELL_DEG on both axes, or either side has no coordinates."""
+    if None in (lat1, lng1, lat2, lng2):
+        return True
+    return (abs(float(lat1) - float(lat2)) <= DEDUP_CELL_DEG
+            and abs(float(lng1) - float(lng2)) <= DEDUP_CELL_DEG)
+
+# Separate file for caches (HTTP responses, geocodes, ...) so they can be wiped freely
+CACHE_DB_PATH = os.path.join(DB_DIR, "cache.db")
+
+def get_cache_connection():
+    """Return a sqlite3.Connection to the cache DB (data/cache.db)."""
+    conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    return conn
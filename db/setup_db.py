@@ -28,14 +28,21 @@
 # # """)
 
 # db/setup_db.py
-import sqlite3
-import os
+"""
+Schema setup for data/businesses.db.
+Schema changes are numbered migrations applied in order; the last applied number is kept in
+PRAGMA user_version, so initialize_db() is cheap to call on every start and never re-runs a step.
+To change the schema, append a new function to MIGRATIONS (never edit a released one).
+"""
+from db.helpers import dedup_key, get_connection
 
-def initialize_db():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect("data/businesses.db")
-    c = conn.cursor()
-    c.execute("""
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _m001_businesses(conn):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS businesses (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT,
@@ -53,6 +60,129 @@ def initialize_db():
             last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized at data/businesses.db")
+
+
+def _m002_columns(conn):
+    # utils/db.py (SQLAlchemy) may have created the table first with only name/lat/lng/address/
+    # source/meta; bring both layouts to the same column set. meta holds enrichment signals,
+    # score and pitch as JSON.
+    have = _columns(conn, "businesses")
+    for col, decl in [("phone", "TEXT"), ("email", "TEXT"), ("instagram", "TEXT"), ("linkedin", "TEXT"),
+                      ("website", "TEXT"), ("city", "TEXT"), ("type", "TEXT"), ("source", "TEXT"),
+                      ("last_updated", "TIMESTAMP"), ("meta", "TEXT")]:
+        if col not in have:
+            conn.execute(f"ALTER TABLE businesses ADD COLUMN {col} {decl}")
+
+
+def _m003_rtree(conn):
+    # R*Tree over business coordinates (points: min == max), kept in sync by triggers so every
+    # writer (db.crud, utils.db / SQLAlchemy, bulk loads) maintains it. Used by CompetitorAgent.
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS businesses_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+    conn.execute("""
+        INSERT OR REPLACE INTO businesses_rtree
+        SELECT id, lat, lat, lng, lng FROM businesses WHERE lat IS NOT NULL AND lng IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS businesses_rtree_ai AFTER INSERT ON businesses
+        WHEN NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO businesses_rtree VALUES (NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS businesses_rtree_au AFTER UPDATE OF lat, lng ON businesses
+        BEGIN
+            DELETE FROM businesses_rtree WHERE id = OLD.id;
+            INSERT INTO businesses_rtree
+            SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng WHERE NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS businesses_rtree_ad AFTER DELETE ON businesses
+        BEGIN
+            DELETE FROM businesses_rtree WHERE id = OLD.id;
+        END
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_type ON businesses(type)")
+
+
+def _m004_density_grids(conn):
+    # per (city, type) competitor-density counts as a little-endian uint32 array, see db/density.py
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS density_grids (
+            city TEXT,
+            type TEXT,
+            cell_m REAL,
+            min_lat REAL,
+            min_lng REAL,
+            lat_step REAL,
+            lng_step REAL,
+            rows INTEGER,
+            cols INTEGER,
+            counts BLOB,
+            total INTEGER,
+            updated_at REAL,
+            PRIMARY KEY (city, type)
+        )
+    """)
+
+
+
+def _m005_dedup_key(conn):
+    # normalized name|address|geocell identity (db.helpers.dedup_key) behind a UNIQUE index, so
+    # upserts are INSERT ... ON CONFLICT(dedup_key). Rows that already collide keep a "#id" suffix
+    # on the newer ones instead of being merged.
+    if "dedup_key" not in _columns(conn, "businesses"):
+        conn.execute("ALTER TABLE businesses ADD COLUMN dedup_key TEXT")
+    seen, keys = set(), []
+    for rid, name, address, lat, lng in conn.execute(
+            "SELECT id, name, address, lat, lng FROM businesses ORDER BY id").fetchall():
+        key = dedup_key(name, address, lat, lng)
+        if key in seen:
+            key = f"{key}#{rid}"
+        seen.add(key)
+        keys.append((key, rid))
+    conn.executemany("UPDATE businesses SET dedup_key = ? WHERE id = ?", keys)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_businesses_dedup_key ON businesses(dedup_key)")
+
+
+
+def _m006_query_indexes(conn):
+    # access paths of db.crud.fetch_all and the Streamlit apps, checked by tests/test_query_plans.py:
+    # city = ? AND type = ? ORDER BY last_updated DESC, the full list by last_updated, and
+    # case-insensitive prefix LIKE on name / city / type (LIKE can only use NOCASE indexes)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_city_type_updated ON businesses(city, type, last_updated)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_updated ON businesses(last_updated)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_name_nocase ON businesses(name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_city_nocase ON businesses(city COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_type_nocase ON businesses(type COLLATE NOCASE)")
+    conn.execute("ANALYZE businesses")
+
+
+MIGRATIONS = [
+    _m001_businesses,
+    _m002_columns,
+    _m003_rtree,
+    _m004_density_grids,
+    _m005_dedup_key,
+    _m006_query_indexes,
+]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return len(MIGRATIONS)
+
+
+def initialize_db():
+    conn = get_connection()
+    try:
+        version = migrate(conn)
+    finally:
+        conn.close()
+    print(f"✅ Database initialized at data/businesses.db (schema v{version})")
@@ -38,7 +38,10 @@ with col1:
         st.session_state["running"] = True
         with st.spinner("Running agents (this may take a minute)..."):
             orch = Orchestrator()
-            leads = orch.run(business_type, city, limit=limit, radius_km=radius_km, language=language)
+            try:
+                leads = orch.run(business_type, city, limit=limit, radius_km=radius_km, language=language)
+            finally:
+                orch.close()
             st.session_state["leads"] = leads
         st.success("Done")
 with col2:
@@ -40,38 +40,41 @@
 
 
 # main.py
+# Only argparse at module level so `python main.py --help` stays instant;
+# the agents/services (requests, bs4, sqlite setup, ...) load when a run starts.
 import argparse
-from agents.discovery_agent import DiscoveryAgent
-from db.crud import upsert_business
-from db.setup_db import initialize_db
 
 def run_and_save(business_type, city, limit=10, radius_km=5):
+    from agents.discovery_agent import DiscoveryAgent
+    from db.crud import bulk_upsert_businesses
+    from db.setup_db import initialize_db
+    from services import http_cache, http_client
     initialize_db()
     disc = DiscoveryAgent()
     items = disc.run(business_type, city, limit=limit, radius_km=radius_km)
     if not items:
         print("Done. 0 items processed.")
         return
-    processed = 0
-    for it in items:
-        lead = {
-            "name": it.get("name"),
-            "address": it.get("address"),
-            "lat": it.get("lat"),
-            "lng": it.get("lng"),
-            "phone": it.get("phone"),
-            "email": it.get("email"),
-            "website": it.get("website"),
-            "instagram": it.get("instagram"),
-            "linkedin": it.get("linkedin"),
-            "city": city,
-            "type": business_type,
-            "source": it.get("source")
-        }
-        bid, created = upsert_business(lead)
+    leads = [{
+        "name": it.get("name"),
+        "address": it.get("address"),
+        "lat": it.get("lat"),
+        "lng": it.get("lng"),
+        "phone": it.get("phone"),
+        "email": it.get("email"),
+        "website": it.get("website"),
+        "instagram": it.get("instagram"),
+        "linkedin": it.get("linkedin"),
+        "city": city,
+        "type": business_type,
+        "source": it.get("source")
+    } for it in items]
+    for lead, (bid, created) in zip(leads, bulk_upsert_businesses(leads)):
         print(f"[Saved {'NEW' if created else 'UPDATED'}] {bid} | {lead.get('name')} | {lead.get('phone') or ''} | {lead.get('instagram') or lead.get('linkedin') or ''}")
-        processed += 1
+    processed = len(leads)
     print(f"Done. {processed} items processed.")
+    print(f"HTTP connection reuse: {http_client.stats_summary()}")
+    print(f"HTTP cache: {http_cache.stats()}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -79,5 +82,9 @@ if __name__ == "__main__":
     parser.add_argument("--city", required=True)
     parser.add_argument("--limit", type=int, default=10)
     parser.add_argument("--radius_km", type=int, default=5)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the on-disk HTTP response cache")
     args = parser.parse_args()
+    if args.no_cache:
+        from services import http_cache
+        http_cache.BYPASS = True
     run_and_save(args.type, args.city, limit=args.limit, radius_km=args.radius_km)
@@ -0,0 +1,133 @@
+# services/geocoder.py
+"""
+City geocoding through Nominatim with two cache layers:
+an in-process LRU in front of a persistent SQLite table (data/cache.db, table `geocodes`).
+City centroids practically never change, so entries live for GEOCODE_TTL_DAYS (default 180).
+Keys are the normalized city string, so "Ahmedabad", " ahmedabad " and "AHMEDABAD." share one entry.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from services import http_client
+from db.helpers import get_cache_connection
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+HEADERS = {"User-Agent": "ai-business-intel-bot/1.0"}
+TTL = float(os.getenv("GEOCODE_TTL_DAYS", "180")) * 86400
+LRU_SIZE = int(os.getenv("GEOCODE_LRU_SIZE", "256"))
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+_key_locks = {}
+_conn = None
+_stats = {"memory_hits": 0, "db_hits": 0, "lookups": 0}
+
+
+def normalize_city(city):
+    s = re.sub(r"[^\w\s]", " ", (city or "").lower())
+    return " ".join(s.split())
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = get_cache_connection()
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                key TEXT PRIMARY KEY,
+                query TEXT,
+                lat REAL,
+                lon REAL,
+                bbox TEXT,
+                display_name TEXT,
+                fetched_at REAL
+            )
+        """)
+        _conn.commit()
+    return _conn
+
+
+def _remember(key, rec):
+    with _lock:
+        _lru[key] = rec
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def _lookup_nominatim(city):
+    resp = http_client.get(NOMINATIM_URL, params={"q": city, "format": "json", "limit": 1}, headers=HEADERS)
+    resp.raise_for_status()
+    data = resp.json()
+    if not data:
+        return None
+    top = data[0]
+    bbox = top.get("boundingbox")  # [south, north, west, east] as strings
+    return {
+        "lat": float(top["lat"]),
+        "lon": float(top["lon"]),
+        "bbox": [float(x) for x in bbox] if bbox else None,
+        "display_name": top.get("display_name"),
+    }
+
+
+def geocode(city, refresh=False):
+    """
+    Return {"lat", "lon", "bbox": [south, north, west, east] or None, "display_name", "source"}
+    or None when the city cannot be geocoded. source is "memory", "db" or "nominatim".
+    """
+    key = normalize_city(city)
+    if not key:
+        return None
+    if not refresh:
+        with _lock:
+            rec = _lru.get(key)
+            if rec is not None:
+                _lru.move_to_end(key)
+                _stats["memory_hits"] += 1
+                return {**rec, "source": "memory"}
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    # one lookup per city even when several workers ask at once
+    with key_lock:
+        if not refresh:
+            with _lock:
+                rec = _lru.get(key)
+            if rec is not None:
+                return {**rec, "source": "memory"}
+            with _lock:
+                row = _db().execute(
+                    "SELECT lat, lon, bbox, display_name, fetched_at FROM geocodes WHERE key = ?", (key,)).fetchone()
+            if row and time.time() - row[4] < TTL:
+                rec = {"lat": row[0], "lon": row[1], "bbox": json.loads(row[2]) if row[2] else None, "display_name": row[3]}
+                _remember(key, rec)
+                with _lock:
+                    _stats["db_hits"] += 1
+                return {**rec, "source": "db"}
+        rec = _lookup_nominatim(city)
+        with _lock:
+            _stats["lookups"] += 1
+        if rec is None:
+            return None
+        with _lock:
+            _db().execute("INSERT OR REPLACE INTO geocodes VALUES (?,?,?,?,?,?,?)",
+                          (key, city, rec["lat"], rec["lon"], json.dumps(rec["bbox"]), rec["display_name"], time.time()))
+            _db().commit()
+        _remember(key, rec)
+        return {**rec, "source": "nominatim"}
+
+
+def geocode_city(city):
+    """Return (lat, lon) or None."""
+    rec = geocode(city)
+    if rec:
+        return rec["lat"], rec["lon"]
+    return None
+
+
+def stats():
+    with _lock:
+        return dict(_stats)
@@ -1,5 +1,6 @@
 # services/google_places.py
-import os, requests
+import os, time, threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 # load_dotenv is still safe if present; utils.config also will attempt to load .env
 try:
@@ -9,6 +10,7 @@ except Exception:
     import sys
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
     from utils.config import get_api_key, where_key_came_from
+from services import http_client
 
 API_KEY = get_api_key("GOOGLE_PLACES_API_KEY")
 KEY_ORIGIN = where_key_came_from("GOOGLE_PLACES_API_KEY")
@@ -16,27 +18,128 @@ HEADERS = {"User-Agent": os.getenv("USER_AGENT", "ai-business-intel-bot/1.0")}
 
 PLACES_TEXT_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 PLACES_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+# next_page_token only becomes valid a couple of seconds after it is issued
+NEXT_PAGE_DELAY = 2.0
+NEXT_PAGE_RETRIES = 4
+# Place Details is billed per call; only ask for what discovery actually uses
+DETAILS_FIELDS = "formatted_phone_number,website"
+DETAILS_CONCURRENCY = int(os.getenv("GOOGLE_DETAILS_CONCURRENCY", "6"))
 
 def is_enabled():
     return bool(API_KEY)
 
-def search_places_google(query, location=None, radius_km=5, limit=20):
+class UsageCounter:
+    """Counts billable Places calls ("text_search" pages, "details"). Thread-safe."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"text_search": 0, "details": 0}
+
+    def add(self, kind, n=1):
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+# process-wide totals; per-run counters are passed in as usage=
+TOTAL_USAGE = UsageCounter()
+
+def _count(kind, usage):
+    TOTAL_USAGE.add(kind)
+    if usage is not None:
+        usage.add(kind)
+
+def normalize_place(r):
+    """Text search result -> {place_id, name, lat, lng, address, raw}"""
+    loc = (r.get("geometry") or {}).get("location") or {}
+    return {
+        "place_id": r.get("place_id"),
+        "name": r.get("name"),
+        "lat": loc.get("lat"),
+        "lng": loc.get("lng"),
+        "address": r.get("formatted_address"),
+        "raw": r,
+    }
+
+def _text_search_page(params, page_token=None, usage=None):
+    if page_token:
+        params = {"pagetoken": page_token, "key": API_KEY}
+        time.sleep(NEXT_PAGE_DELAY)
+    for attempt in range(NEXT_PAGE_RETRIES):
+        r = http_client.get(PLACES_TEXT_URL, params=params, headers=HEADERS)
+        _count("text_search", usage)
+        r.raise_for_status()
+        data = r.json()
+        status = data.get("status")
+        # INVALID_REQUEST on a fresh token means "not ready yet"
+        if page_token and status == "INVALID_REQUEST" and attempt < NEXT_PAGE_RETRIES - 1:
+            time.sleep(NEXT_PAGE_DELAY)
+            continue
+        if status not in ("OK", "ZERO_RESULTS"):
+            raise RuntimeError(f"Google Places text search failed: {status} {data.get('error_message', '')}".strip())
+        return data
+
+def iter_places_google(query, location=None, radius_km=5, limit=20, usage=None):
+    """
+    Yield normalized place records (see normalize_place), following next_page_token until
+    `limit` records were yielded or Google has no more pages (text search stops at 60).
+    The next page is requested in the background while the caller works on the current one.
+    """
     if not is_enabled():
         raise RuntimeError(f"Google Places API key not found. Searched: {KEY_ORIGIN}")
     params = {"query": query, "key": API_KEY, "language": "en"}
     if location:
         params["location"] = location
         params["radius"] = int(radius_km * 1000)
-    r = requests.get(PLACES_TEXT_URL, params=params, headers=HEADERS, timeout=10)
-    r.raise_for_status()
-    data = r.json()
-    # just return results list (caller will handle)
-    return data
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gp-page")
+    try:
+        pending = pool.submit(_text_search_page, params, None, usage)
+        yielded = 0
+        while pending is not None and yielded < limit:
+            data = pending.result()
+            results = data.get("results", [])[:limit - yielded]
+            token = data.get("next_page_token")
+            pending = None
+            if token and yielded + len(results) < limit:
+                pending = pool.submit(_text_search_page, params, token, usage)
+            for r in results:
+                yield normalize_place(r)
+                yielded += 1
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
-def get_place_details(place_id, fields="name,formatted_phone_number,website,formatted_address"):
+def search_places_google(query, location=None, radius_km=5, limit=20, usage=None):
+    """List form of iter_places_google()."""
+    return list(iter_places_google(query, location=location, radius_km=radius_km, limit=limit, usage=usage))
+
+def get_place_details(place_id, fields="name,formatted_phone_number,website,formatted_address", usage=None):
+    """fields: field mask as a comma-separated string or a list of field names."""
     if not is_enabled():
         raise RuntimeError(f"Google Places API key not found. Searched: {KEY_ORIGIN}")
+    if not isinstance(fields, str):
+        fields = ",".join(fields)
     params = {"place_id": place_id, "key": API_KEY, "fields": fields}
-    r = requests.get(PLACES_DETAILS_URL, params=params, headers=HEADERS, timeout=10)
+    r = http_client.get(PLACES_DETAILS_URL, params=params, headers=HEADERS)
+    _count("details", usage)
     r.raise_for_status()
     return r.json().get("result", {}) or {}
+
+def get_place_details_many(place_ids, fields=DETAILS_FIELDS, max_workers=None, usage=None):
+    """
+    Fetch details for many places concurrently (at most max_workers in flight,
+    default GOOGLE_DETAILS_CONCURRENCY). Returns {place_id: details}; failed or empty ids map to {}.
+    Each distinct id is requested once.
+    """
+    ids = list(dict.fromkeys(p for p in place_ids if p))
+    out = {}
+    if not ids:
+        return out
+    with ThreadPoolExecutor(max_workers=max_workers or DETAILS_CONCURRENCY, thread_name_prefix="gp-details") as pool:
+        futures = {pid: pool.submit(get_place_details, pid, fields, usage) for pid in ids}
+        for pid, f in futures.items():
+            try:
+                out[pid] = f.result()
+            except Exception:
+                out[pid] = {}
+    return out
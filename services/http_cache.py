@@ -0,0 +1,210 @@
+# services/http_cache.py
+"""
+Persistent HTTP response cache (data/cache.db) in front of services.http_client.
+- per-domain TTLs (DOMAIN_TTLS, default HTTP_CACHE_TTL seconds)
+- size-bounded LRU eviction (HTTP_CACHE_MAX_MB)
+- stale entries are revalidated with If-None-Match / If-Modified-Since; a 304 refreshes
+  the entry without downloading the body again
+- bypass with HTTP_CACHE_BYPASS=1, by setting BYPASS = True, or per call with bypass=True
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlparse
+import requests
+from requests.structures import CaseInsensitiveDict
+from services import http_client
+from db.helpers import get_cache_connection
+
+DEFAULT_TTL = int(os.getenv("HTTP_CACHE_TTL", str(24 * 3600)))
+MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "200")) * 1024 * 1024)
+BYPASS = os.getenv("HTTP_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+# Matched on the host suffix; first match wins
+DOMAIN_TTLS = {
+    "duckduckgo.com": 6 * 3600,
+    "googleapis.com": 3600,
+    "nominatim.openstreetmap.org": 7 * 24 * 3600,
+}
+
+_lock = threading.Lock()
+_conn = None
+_stats = {"hits": 0, "misses": 0, "revalidated": 0, "bypassed": 0, "stored": 0, "evicted": 0}
+
+
+class CachedResponse:
+    """The subset of requests.Response the scrapers use, backed by a cache row or a live response."""
+
+    def __init__(self, url, status_code, headers, content, encoding=None, elapsed_ms=0, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.content = content or b""
+        self.encoding = encoding
+        self.elapsed = timedelta(milliseconds=elapsed_ms)
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    @classmethod
+    def from_response(cls, r):
+        return cls(r.url, r.status_code, dict(r.headers), r.content,
+                   encoding=r.encoding or r.apparent_encoding,
+                   elapsed_ms=int(r.elapsed.total_seconds() * 1000))
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = get_cache_connection()
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_responses (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                encoding TEXT,
+                elapsed_ms INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                last_access REAL,
+                size INTEGER
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_http_responses_access ON http_responses(last_access)")
+        _conn.commit()
+    return _conn
+
+
+def ttl_for(url):
+    host = urlparse(url).hostname or ""
+    for suffix, ttl in DOMAIN_TTLS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return ttl
+    return DEFAULT_TTL
+
+
+def _key(method, url, params=None, data=None):
+    raw = json.dumps([method.upper(), url, sorted((params or {}).items()), sorted((data or {}).items())], default=str)
+    return hashlib.sha256(raw.encode("utf8")).hexdigest()
+
+
+def _row_to_response(row):
+    url, status, headers, body, encoding, elapsed_ms = row
+    return CachedResponse(url, status, json.loads(headers), body, encoding, elapsed_ms, from_cache=True)
+
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    victims = []
+    for key, size in conn.execute("SELECT key, size FROM http_responses ORDER BY last_access"):
+        victims.append((key,))
+        total -= size
+        if total <= MAX_BYTES:
+            break
+    conn.executemany("DELETE FROM http_responses WHERE key = ?", victims)
+    _stats["evicted"] += len(victims)
+
+
+def _store(key, r, now):
+    size = len(r.content)
+    if size > MAX_BYTES:
+        return
+    with _lock:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO http_responses VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+            (key, r.url, r.status_code, json.dumps(dict(r.headers)), r.content, r.encoding,
+             int(r.elapsed.total_seconds() * 1000), r.headers.get("ETag"), r.headers.get("Last-Modified"),
+             now + ttl_for(r.url), now, size),
+        )
+        _evict(conn)
+        conn.commit()
+        _stats["stored"] += 1
+
+
+def request(method, url, params=None, data=None, headers=None, timeout=None, bypass=False):
+    """Cached counterpart of http_client.request(); returns a CachedResponse."""
+    if bypass or BYPASS:
+        with _lock:
+            _stats["bypassed"] += 1
+        return CachedResponse.from_response(
+            http_client.request(method, url, params=params, data=data, headers=headers, timeout=timeout))
+
+    key = _key(method, url, params, data)
+    now = time.time()
+    with _lock:
+        row = _db().execute(
+            "SELECT url, status, headers, body, encoding, elapsed_ms, etag, last_modified, expires_at "
+            "FROM http_responses WHERE key = ?", (key,)).fetchone()
+        if row and row[8] > now:
+            _db().execute("UPDATE http_responses SET last_access = ? WHERE key = ?", (now, key))
+            _db().commit()
+            _stats["hits"] += 1
+            return _row_to_response(row[:6])
+
+    req_headers = dict(headers or {})
+    if row:
+        if row[6]:
+            req_headers["If-None-Match"] = row[6]
+        if row[7]:
+            req_headers["If-Modified-Since"] = row[7]
+    r = http_client.request(method, url, params=params, data=data, headers=req_headers, timeout=timeout)
+
+    if r.status_code == 304 and row:
+        with _lock:
+            _db().execute("UPDATE http_responses SET expires_at = ?, last_access = ? WHERE key = ?",
+                          (now + ttl_for(row[0]), now, key))
+            _db().commit()
+            _stats["revalidated"] += 1
+        return _row_to_response(row[:6])
+
+    with _lock:
+        _stats["misses"] += 1
+    resp = CachedResponse.from_response(r)
+    if r.status_code == 200 and "no-store" not in r.headers.get("Cache-Control", ""):
+        _store(key, resp, now)
+    return resp
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def stats():
+    """Counters since process start plus hit_rate over cache lookups."""
+    with _lock:
+        out = dict(_stats)
+    looked_up = out["hits"] + out["revalidated"] + out["misses"]
+    out["hit_rate"] = round((out["hits"] + out["revalidated"]) / looked_up, 3) if looked_up else 0.0
+    return out
+
+
+def clear():
+    with _lock:
+        _db().execute("DELETE FROM http_responses")
+        _db().commit()
@@ -0,0 +1,122 @@
+# services/http_client.py
+"""
+Shared HTTP client for everything under services/.
+One requests.Session is reused process-wide so each host keeps a pool of keep-alive
+connections (TCP+TLS setup is paid once per host, not once per request).
+Pool sizes and the default timeout come from env:
+  HTTP_POOL_CONNECTIONS  number of per-host pools kept (default 20)
+  HTTP_POOL_MAXSIZE      connections kept per host (default 16)
+  HTTP_TIMEOUT           default timeout in seconds (default 10)
+gzip/deflate responses are decoded by requests; brotli is advertised only when the
+`brotli` package is installed (urllib3 decodes it transparently then).
+Every request is paced by services.rate_limiter; 429/503 answers with Retry-After are
+retried (up to HTTP_RETRY_AFTER_MAX times) once the host's pause is over.
+"""
+import os
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from services import rate_limiter
+
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except Exception:
+    BROTLI_AVAILABLE = False
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+RETRY_AFTER_MAX = int(os.getenv("HTTP_RETRY_AFTER_MAX", "2"))
+
+ACCEPT_ENCODING = "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate"
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_requests_by_host = {}
+
+
+def get_session():
+    """Return the process-wide session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+                _session = s
+    return _session
+
+
+def request(method, url, **kwargs):
+    """requests.request() on the shared session, with the default timeout and host pacing applied."""
+    if kwargs.get("timeout") is None:
+        kwargs["timeout"] = DEFAULT_TIMEOUT
+    host = urlparse(url).hostname or ""
+    for attempt in range(RETRY_AFTER_MAX + 1):
+        rate_limiter.acquire(host)
+        with _stats_lock:
+            _requests_by_host[host] = _requests_by_host.get(host, 0) + 1
+        r = get_session().request(method, url, **kwargs)
+        if r.status_code in (429, 503):
+            delay = rate_limiter.parse_retry_after(r.headers.get("Retry-After"))
+            if delay is not None:
+                rate_limiter.defer(host, delay)
+                if attempt < RETRY_AFTER_MAX:
+                    continue
+        return r
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def stats():
+    """
+    Connection reuse counters per host:
+      {host: {"requests": n, "connections": opened, "reused": n - opened}}
+    "connections" comes from urllib3's per-host pool (num_connections), so reused is the
+    number of requests that did not need a fresh TCP/TLS handshake.
+    """
+    with _stats_lock:
+        out = {h: {"requests": n, "connections": 0, "reused": 0} for h, n in _requests_by_host.items()}
+    if _session is None:
+        return out
+    pool_requests = {}
+    seen = set()
+    for adapter in _session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            entry = out.setdefault(pool.host, {"requests": 0, "connections": 0, "reused": 0})
+            entry["connections"] += pool.num_connections
+            pool_requests[pool.host] = pool_requests.get(pool.host, 0) + pool.num_requests
+    for host, n in pool_requests.items():
+        out[host]["reused"] = max(0, n - out[host]["connections"])
+    return out
+
+
+def reset_stats():
+    with _stats_lock:
+        _requests_by_host.clear()
+
+
+def stats_summary():
+    """One-line summary of stats() for run logs."""
+    parts = [f"{h}: {s['reused']}/{s['requests']} reused ({s['connections']} conns)"
+             for h, s in sorted(stats().items()) if s["requests"]]
+    return "; ".join(parts) or "no requests"
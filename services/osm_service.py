@@ -1,24 +1,32 @@
 # services/osm_service.py
-import requests
 from urllib.parse import urlencode
 from urllib.parse import quote_plus
 from utils.helpers import retry_on_exception
+from services import http_client
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
 HEADERS = {"User-Agent": "ai-business-intel-bot/1.0"}
 
-def search_places_osm(query, city=None, limit=20):
+# Nominatim never returns more than this many results for one query
+MAX_LIMIT = 50
+
+def search_places_osm(query, city=None, limit=20, viewbox=None):
     """
     Simple Nominatim search. Query e.g. "dental clinic, Ahmedabad"
+    viewbox: optional (south, north, west, east); results are restricted to that box.
     Returns list of {name, lat, lon, display_name}
     """
     q = query
     if city:
         q = f"{query}, {city}, India"
-    params = {"q": q, "format": "json", "limit": limit}
+    params = {"q": q, "format": "json", "limit": min(limit, MAX_LIMIT)}
+    if viewbox:
+        south, north, west, east = viewbox
+        params["viewbox"] = f"{west},{north},{east},{south}"
+        params["bounded"] = 1
     url = f"{NOMINATIM_URL}?{urlencode(params)}"
-    resp = retry_on_exception(lambda: requests.get(url, headers=HEADERS, timeout=10), attempts=3)
+    resp = retry_on_exception(lambda: http_client.get(url, headers=HEADERS), attempts=3)
     data = resp.json()
     out = []
     for item in data:
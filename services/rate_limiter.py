@@ -0,0 +1,139 @@
+# services/rate_limiter.py
+"""
+Per-host token-bucket scheduler shared by every outgoing request.
+- A host with tokens left goes out immediately (no fixed sleeps).
+- When a host is out of budget, callers reserve the next free slot in arrival order, so
+  concurrent workers are served first-come first-served instead of racing.
+- Retry-After from a 429/503 pushes the host's next slot out (defer()).
+Hosts without a budget are not throttled.
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# host suffix -> (requests per second, burst)
+BUDGETS = {
+    "nominatim.openstreetmap.org": (1.0, 1),   # usage policy: max 1 req/s
+    "duckduckgo.com": (1.0, 3),
+    "maps.googleapis.com": (10.0, 10),
+    "instagram.com": (0.5, 2),
+    "facebook.com": (0.5, 2),
+    "twitter.com": (0.5, 2),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        # refill runs from here; in the future while a Retry-After block is active
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """Take one token and return how long the caller must wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            deficit = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            # waiters queued behind a block are spaced by 1/rate after it, not released together
+            return (self.updated - now) + deficit
+
+    def defer(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self.updated:
+                # the server asked for a pause: one request may go when it ends, the rest
+                # follow at the normal rate (no burst), since refill starts at its end
+                self.tokens = min(self.tokens, 1.0)
+                self.updated = until
+
+
+_buckets = {}
+_lock = threading.Lock()
+_stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "deferred": 0}
+
+
+def _budget_key(host):
+    host = (host or "").lower()
+    # set_budget() may add hosts from other threads
+    with _lock:
+        suffixes = list(BUDGETS)
+    for suffix in suffixes:
+        if host == suffix or host.endswith("." + suffix):
+            return suffix
+    return None
+
+
+def _bucket(host):
+    key = _budget_key(host)
+    if key is None:
+        return None
+    with _lock:
+        b = _buckets.get(key)
+        if b is None:
+            b = _buckets[key] = TokenBucket(*BUDGETS[key])
+        return b
+
+
+def set_budget(host_suffix, rate, burst=1):
+    """Add or change a host budget at runtime."""
+    with _lock:
+        BUDGETS[host_suffix] = (rate, burst)
+        _buckets.pop(host_suffix, None)
+
+
+def acquire(host):
+    """Block until a request to `host` is allowed. Returns the seconds waited."""
+    b = _bucket(host)
+    if b is None:
+        return 0.0
+    wait = b.reserve()
+    with _lock:
+        _stats["acquired"] += 1
+        if wait > 0:
+            _stats["waited"] += 1
+            _stats["wait_seconds"] += wait
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+def parse_retry_after(value):
+    """Retry-After header (seconds or HTTP date) -> seconds, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def defer(host, seconds):
+    b = _bucket(host)
+    if b is None:
+        # unknown host told us to slow down: give it a conservative budget from now on
+        set_budget((host or "").lower(), 1.0, 1)
+        b = _bucket(host)
+    b.defer(seconds)
+    with _lock:
+        _stats["deferred"] += 1
+
+
+def stats():
+    with _lock:
+        out = dict(_stats)
+    out["wait_seconds"] = round(out["wait_seconds"], 2)
+    return out
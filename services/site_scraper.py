@@ -1,29 +1,111 @@
 # services/site_scraper.py
-import requests
 from bs4 import BeautifulSoup
 import re
+import threading
 from urllib.parse import urljoin
 from dotenv import load_dotenv
+from services import http_cache, http_client
 load_dotenv()
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; ai-business-intel-bot/1.0)"}
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 PHONE_RE = re.compile(r"(\+?\d[\d\-\s]{6,}\d)")
 
-def fetch_html(url, timeout=8):
+
+class Page:
+    """
+    A downloaded page: the HTTP response plus one parsed BeautifulSoup tree.
+    The tree is built on first access and shared by every extractor afterwards.
+    """
+
+    def __init__(self, url, response=None, error=None):
+        self.url = url
+        self.response = response
+        self.error = error
+        self._soup = None
+        self._lock = threading.Lock()
+
+    @property
+    def ok(self):
+        return self.response is not None and self.error is None
+
+    @property
+    def status_code(self):
+        return self.response.status_code if self.response is not None else None
+
+    @property
+    def headers(self):
+        return self.response.headers if self.response is not None else {}
+
+    @property
+    def text(self):
+        return self.response.text if self.ok else None
+
+    @property
+    def soup(self):
+        if self._soup is None and self.text:
+            with self._lock:
+                if self._soup is None:
+                    self._soup = BeautifulSoup(self.text, "html.parser")
+        return self._soup
+
+
+def _download(url, timeout=None):
     try:
-        r = requests.get(url, headers=HEADERS, timeout=timeout)
+        # goes through the on-disk response cache (see services/http_cache.py)
+        r = http_cache.get(url, headers=HEADERS, timeout=timeout or http_client.DEFAULT_TIMEOUT)
         r.raise_for_status()
-        return r.text
-    except Exception:
-        return None
+        return Page(url, r)
+    except Exception as e:
+        return Page(url, getattr(e, "response", None), error=str(e))
+
+
+class PageCache:
+    """
+    Per-run page store keyed by URL. Each URL is downloaded and parsed at most once,
+    even when several extractors ask for it concurrently.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        key = url.split("#")[0]
+        with self._lock:
+            url_lock = self._locks.setdefault(key, threading.Lock())
+        with url_lock:
+            page = self._pages.get(key)
+            if page is None:
+                page = _download(url, timeout)
+                self._pages[key] = page
+        return page
 
-def extract_social_links(url):
+    def __len__(self):
+        return len(self._pages)
+
+
+def fetch_page(url, pages=None, timeout=None):
+    """Return the Page for url, from `pages` (a PageCache) when given."""
+    if pages is None:
+        return _download(url, timeout)
+    return pages.get(url, timeout)
+
+
+def fetch_url(url, pages=None):
+    return fetch_page(url, pages)
+
+
+def fetch_html(url, timeout=None, pages=None):
+    return fetch_page(url, pages, timeout).text
+
+
+def extract_social_links(url, pages=None):
     """Return dict {instagram: [urls], linkedin: [urls], facebook: [urls], website: url}"""
-    html = fetch_html(url)
-    if not html:
+    soup = fetch_page(url, pages).soup
+    if soup is None:
         return {}
-    soup = BeautifulSoup(html, "html.parser")
     out = {}
     for a in soup.find_all("a", href=True):
         href = a["href"].strip()
@@ -37,8 +119,11 @@ def extract_social_links(url):
             out.setdefault("facebook", []).append(href.split("?")[0])
     return out
 
-def extract_emails_and_phones(url):
-    html = fetch_html(url)
+extract_social_links_from_site = extract_social_links
+
+def extract_emails_and_phones(url, pages=None):
+    page = fetch_page(url, pages)
+    html = page.text
     emails = set()
     phones = set()
     if not html:
@@ -49,7 +134,9 @@ def extract_emails_and_phones(url):
         cleaned = re.sub(r"[\s\-()]", "", m)
         if 6 <= len(cleaned) <= 15:
             phones.add(cleaned)
-    soup = BeautifulSoup(html, "html.parser")
+    soup = page.soup
+    if soup is None:
+        return list(emails), list(phones)
     for a in soup.find_all("a", href=True):
         href = a["href"]
         if href.startswith("mailto:"):
@@ -57,3 +144,49 @@ def extract_emails_and_phones(url):
         if href.startswith("tel:"):
             phones.add(re.sub(r"[\s\-()]", "", href.split("tel:")[1]))
     return list(emails), list(phones)
+
+def extract_emails_from_site(url, pages=None):
+    return extract_emails_and_phones(url, pages)[0]
+
+def extract_phones_from_site(url, pages=None):
+    return extract_emails_and_phones(url, pages)[1]
+
+def compute_basic_site_health(url, pages=None):
+    """
+    Cheap on-page checks. Returns {"score": 0-100, "issues": [...], ...}.
+    """
+    page = fetch_page(url, pages)
+    if not page.ok:
+        return {"score": 0, "issues": [f"Website unreachable ({page.error})"], "status_code": page.status_code}
+    soup = page.soup
+    if soup is None:
+        # 200 with an empty body: nothing to parse
+        return {"score": 0, "issues": ["Website returned an empty page"], "status_code": page.status_code}
+    issues = []
+    score = 100
+    if not page.response.url.startswith("https://"):
+        issues.append("Website does not use HTTPS")
+        score -= 25
+    load_ms = int(page.response.elapsed.total_seconds() * 1000)
+    if load_ms > 3000:
+        issues.append(f"Slow page load ({load_ms} ms)")
+        score -= 15
+    if not (soup.title and soup.title.string and soup.title.string.strip()):
+        issues.append("Missing page title")
+        score -= 15
+    if not soup.find("meta", attrs={"name": "description"}):
+        issues.append("Missing meta description")
+        score -= 15
+    if not soup.find("meta", attrs={"name": "viewport"}):
+        issues.append("Not mobile friendly (no viewport meta tag)")
+        score -= 20
+    if not soup.find("h1"):
+        issues.append("No H1 heading")
+        score -= 10
+    return {
+        "score": max(0, score),
+        "issues": issues,
+        "status_code": page.status_code,
+        "load_time_ms": load_ms,
+        "page_kb": round(len(page.response.content) / 1024, 1),
+    }
@@ -1,18 +1,20 @@
 # services/social_tools.py
-from facebook_scraper import get_profile
-import instaloader
+# The scraper libraries (facebook_scraper, instaloader, snscrape) are slow to import, so each
+# one is imported on first use inside the function that needs it.
 import subprocess
 import json
 import re
 import tempfile
 from utils.helpers import retry_on_exception
-import snscrape.modules.twitter as sntwitter
+from services import rate_limiter
 
 def get_facebook_metrics(fb_url_or_name):
     """
     Uses facebook_scraper.get_profile (works for many public pages). Returns dict with follower_count, likes_count, posts_count...
     """
+    rate_limiter.acquire("www.facebook.com")
     try:
+        from facebook_scraper import get_profile
         # facebook_scraper accepts page name or url
         p = get_profile(fb_url_or_name, cookies=None)
         # p is a dict-like object
@@ -24,7 +26,9 @@ def get_instagram_profile_metrics(insta_url_or_name):
     """
     Uses instaloader programmatically to fetch profile metadata. Returns followers, posts count, last_post_date (iso) if possible.
     """
+    rate_limiter.acquire("www.instagram.com")
     try:
+        import instaloader
         L = instaloader.Instaloader()
         profile_name = insta_url_or_name.rstrip("/").split("/")[-1]
         profile = instaloader.Profile.from_username(L.context, profile_name)
@@ -45,7 +49,9 @@ def get_twitter_metrics(username_or_url, max_tweets=30):
     Uses snscrape to fetch basic metrics for a user: follower count isn't returned directly by snscrape's scraper
     but we can fetch recent tweets and compute engagement sample.
     """
+    rate_limiter.acquire("twitter.com")
     try:
+        import snscrape.modules.twitter as sntwitter
         # get username
         uname = username_or_url.rstrip("/").split("/")[-1]
         tweets = []
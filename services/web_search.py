@@ -1,16 +1,22 @@
 # services/web_search.py
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, unquote, urlparse
 from dotenv import load_dotenv
+from services import http_cache
 load_dotenv()
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; ai-business-intel-bot/1.0)"}
 DDG_HTML = "https://html.duckduckgo.com/html/"
 
+# result host suffix -> profile kind in find_profiles_by_search()
+PROFILE_HOSTS = {"instagram.com": "instagram", "linkedin.com": "linkedin", "facebook.com": "facebook"}
+# listing / aggregator sites that are never the business's own website
+NOT_WEBSITES = ("duckduckgo.com", "google.com", "justdial.com", "youtube.com", "twitter.com", "x.com",
+                "wikipedia.org", "tripadvisor.com", "zomato.com", "practo.com", "indiamart.com")
+
 def duckduckgo_search_urls(query, max_results=6):
     try:
-        resp = requests.post(DDG_HTML, data={"q": query}, headers=HEADERS, timeout=8)
+        resp = http_cache.post(DDG_HTML, data={"q": query}, headers=HEADERS)
         resp.raise_for_status()
         soup = BeautifulSoup(resp.text, "html.parser")
         out = []
@@ -32,3 +38,30 @@ def duckduckgo_search_urls(query, max_results=6):
         return out
     except Exception:
         return []
+
+def _unwrap(url):
+    """DuckDuckGo result links may be redirects (//duckduckgo.com/l/?uddg=<target>)."""
+    target = parse_qs(urlparse(url).query).get("uddg")
+    return unquote(target[0]) if target else url
+
+def _host_matches(host, suffix):
+    return host == suffix or host.endswith("." + suffix)
+
+def find_profiles_by_search(name, city=None, max_results=6):
+    """
+    Web search for a business without a known website.
+    Returns {"website_candidates": [...], "instagram": [...], "linkedin": [...], "facebook": [...]}.
+    """
+    out = {"website_candidates": [], **{kind: [] for kind in PROFILE_HOSTS.values()}}
+    query = " ".join(p for p in (name, city) if p)
+    for url in duckduckgo_search_urls(query, max_results=max_results):
+        url = _unwrap(url)
+        host = urlparse(url).netloc.lower()
+        if not host:
+            continue
+        kind = next((k for suffix, k in PROFILE_HOSTS.items() if _host_matches(host, suffix)), None)
+        if kind:
+            out[kind].append(url)
+        elif not any(_host_matches(host, s) for s in NOT_WEBSITES):
+            out["website_candidates"].append(url)
+    return out
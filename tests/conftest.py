@@ -0,0 +1,20 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+import pytest
+
+# ensure project root on sys.path for agents/db/services imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def temp_db(monkeypatch, tmp_path):
+    """Point db.helpers at a fresh, migrated businesses DB (never data/businesses.db)."""
+    from db import density, helpers
+    from db.setup_db import migrate
+    monkeypatch.setattr(helpers, "DB_PATH", str(tmp_path / "businesses.db"))
+    monkeypatch.setattr(density, "_grids", {})
+    conn = helpers.get_connection()
+    migrate(conn)
+    conn.close()
+    return helpers.DB_PATH
@@ -0,0 +1,31 @@
+# tests/test_dedup.py
+from db import crud
+
+LEAD = {"name": "Smile Dental", "address": "12 CG Road, Navrangpura", "city": "Ahmedabad", "type": "dental clinic"}
+
+
+def test_points_across_a_cell_edge_are_one_row(temp_db):
+    bid, created = crud.upsert_business({**LEAD, "lat": 23.00999, "lng": 72.56})
+    assert created
+    assert crud.upsert_business({**LEAD, "lat": 23.01001, "lng": 72.56, "phone": "123"}) == (bid, False)
+    assert crud.fetch_by_id(bid)["phone"] == "123"
+    conn = crud.get_connection()
+    assert crud.find_existing(conn, LEAD["name"], LEAD["address"], 23.01001, 72.55999) == bid
+    conn.close()
+
+
+def test_with_and_without_coordinates_are_one_row(temp_db):
+    bid, _ = crud.upsert_business({**LEAD, "lat": None, "lng": None})
+    assert crud.upsert_business({**LEAD, "lat": 23.02, "lng": 72.56}) == (bid, False)
+    assert crud.fetch_by_id(bid)["lat"] == 23.02
+    assert crud.upsert_business({**LEAD, "name": "smile  dental", "lat": None, "lng": None}) == (bid, False)
+
+
+def test_same_name_far_apart_and_repeats_within_a_batch(temp_db):
+    res = crud.bulk_upsert_businesses([{**LEAD, "lat": 23.0, "lng": 72.5},
+                                       {**LEAD, "lat": None, "lng": None},
+                                       {**LEAD, "lat": 23.1, "lng": 72.5},
+                                       {**LEAD, "lat": 23.0001, "lng": 72.5}])
+    assert [c for _, c in res] == [True, False, True, False]
+    assert res[0][0] == res[1][0] == res[3][0] != res[2][0]
+    assert len(crud.fetch_all()) == 2
@@ -0,0 +1,41 @@
+# tests/test_density.py
+import numpy as np
+import pytest
+
+density = pytest.importorskip("db.density")
+
+
+def haversine_counts(q, pts, radius_km):
+    la1, la2 = np.radians(q[:, 0])[:, None], np.radians(pts[:, 0])[None]
+    dln = np.radians(pts[:, 1])[None] - np.radians(q[:, 1])[:, None]
+    a = np.sin((la2 - la1) / 2) ** 2 + np.cos(la1) * np.cos(la2) * np.sin(dln / 2) ** 2
+    return (2 * 6371.0088 * np.arcsin(np.sqrt(a)) <= radius_km).sum(axis=1)
+
+
+def test_count_near_follows_the_disc():
+    rng = np.random.default_rng(0)
+    centres = rng.uniform([23.0, 72.5], [23.1, 72.65], size=(6, 2))
+    pts = np.vstack([c + rng.normal(0, 0.008, size=(800, 2)) for c in centres]
+                    + [rng.uniform([22.95, 72.45], [23.15, 72.7], size=(2000, 2))])
+    q = pts[rng.choice(len(pts), 200, replace=False)]
+    g = density.DensityGrid.from_points("ahmedabad", "dental clinic", pts[:, 0], pts[:, 1], cell_m=500)
+    exact = haversine_counts(q, pts, 2.0)
+    est = g.count_near(q[:, 0], q[:, 1], 2.0)
+    rel = (est - exact) / exact
+    # a square window of cells overcounts by ~65%; the disc-weighted estimate stays close
+    assert abs(rel.mean()) < 0.02
+    assert np.abs(rel).mean() < 0.05
+    assert np.isscalar(g.count_near(23.05, 72.55, 2.0))
+
+
+def test_first_insert_of_a_pair_builds_its_grid(temp_db):
+    from db import crud
+    assert density.get_grid("Surat", "gym") is None
+    crud.bulk_upsert_businesses([{"name": f"Gym {i}", "address": f"{i} Ring Road", "city": "Surat", "type": "gym",
+                                  "lat": 21.17 + i / 1000, "lng": 72.83} for i in range(3)])
+    g = density.get_grid("Surat", "gym")
+    assert g is not None and g.total == 3
+    crud.upsert_business({"name": "Gym 9", "address": "9 Ring Road", "city": "Surat", "type": "gym",
+                          "lat": 21.171, "lng": 72.83})
+    assert density.get_grid("surat", "gym").total == 4
+    assert density.count_near("Surat", "gym", 21.171, 72.83, 2.0) == 4
@@ -0,0 +1,156 @@
+# tests/test_orchestrator.py
+"""
+Drives Orchestrator.run() end to end with stubbed agents (no network, models or DB) and checks
+that both modes return and persist leads in discovery order with the same shape, and that
+deferred mode saves every lead once and then only patches the model output into meta.
+"""
+import random
+import time
+import pytest
+
+orchestrator = pytest.importorskip("agents.orchestrator")
+
+N = 6
+LEAD_KEYS = {"name", "address", "lat", "lng", "phone", "email", "instagram", "linkedin", "website",
+             "city", "type", "meta"}
+META_KEYS = {"site_health", "social", "competitor", "score", "email", "phone", "instagram", "linkedin",
+             "website", "pitch", "pitch_template"}
+
+
+class StubDiscovery:
+    def run(self, business_type, city, limit=10, radius_km=5, pages=None):
+        return [{"name": f"Biz {i}", "address": f"{i} Main Road", "lat": 23.0 + i / 100, "lng": 72.5,
+                 "website": f"http://biz{i}.example" if i % 2 == 0 else None, "phone": None}
+                for i in range(N)]
+
+
+class StubDigital:
+    def run(self, url, pages=None):
+        # later leads finish first, so ordering has to come from the orchestrator
+        time.sleep(0.01 * (N - int(url[len("http://biz"):].split(".")[0])) + random.random() / 100)
+        return {"health": {"score": 40, "issues": []}, "social_links": {}}
+
+
+class StubSocial:
+    def run(self, links):
+        return {}
+
+    def discover_by_name(self, name):
+        time.sleep(random.random() / 100)
+        return {}
+
+
+class StubCompetitor:
+    def run(self, name, lat, lng, radius_km=2, limit=10, business_type=None):
+        return {"competitor_count": 1, "sample_competitors": [], "radius_km": radius_km}
+
+    def close(self):
+        self.closed = True
+
+
+class StubSession:
+    def close(self):
+        self.closed = True
+
+
+class StubGrowth:
+    def score(self, aggregated):
+        return {"opportunity_score": 80.0, "grade": "HIGH", "explanation": None}
+
+    def explain_batch(self, items, batch_size=None):
+        return [f"explained {i}" for i in range(len(items))]
+
+    def close(self):
+        pass
+
+
+class StubPitch:
+    def run_batch(self, items, language="en", batch_size=None):
+        return [{"pitch": f"Hi {b['name']}. Reply 'unsubscribe' to opt out.", "lang": language, "template": "v1"}
+                for b, _ in items]
+
+    def close(self):
+        pass
+
+
+class StubCompliance:
+    def run(self, text):
+        return {"ok": True, "issues": []}
+
+
+@pytest.fixture
+def meta_updates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(orchestrator, "update_meta", lambda session, updates: calls.append(updates))
+    return calls
+
+
+@pytest.fixture
+def saved(monkeypatch, meta_updates):
+    rows = []
+
+    class Row:
+        def __init__(self, id):
+            self.id = id
+
+    def upsert_business(session, lead):
+        rows.append(lead)
+        return Row(len(rows)), True
+
+    for name, stub in [("DiscoveryAgent", StubDiscovery), ("DigitalPresenceAgent", StubDigital),
+                       ("SocialAgent", StubSocial), ("CompetitorAgent", StubCompetitor),
+                       ("GrowthAgent", StubGrowth), ("PitchAgent", StubPitch), ("ComplianceAgent", StubCompliance)]:
+        monkeypatch.setattr(orchestrator, name, stub)
+    monkeypatch.setattr(orchestrator, "init_db", lambda: None)
+    monkeypatch.setattr(orchestrator, "SessionLocal", StubSession)
+    monkeypatch.setattr(orchestrator, "upsert_business", upsert_business)
+    monkeypatch.setattr(orchestrator, "extract_emails_from_site", lambda url, pages=None: [])
+    monkeypatch.setattr(orchestrator, "extract_phones_from_site", lambda url, pages=None: ["+91 99999 00000"])
+    monkeypatch.setattr(orchestrator, "find_profiles_by_search", lambda name, city=None, max_results=6: {})
+    return rows
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+@pytest.mark.parametrize("explain", ["inline", "off"])
+def test_run_keeps_order_and_shape(saved, concurrent, explain):
+    orch = orchestrator.Orchestrator(io_workers=4, lead_workers=4, explain=explain)
+    results = orch.run("dental clinic", "Ahmedabad", limit=N, concurrent=concurrent)
+
+    names = [f"Biz {i}" for i in range(N)]
+    assert [r["name"] for r in results] == names
+    assert [r["name"] for r in saved] == names
+    for i, lead in enumerate(results):
+        assert set(lead) == LEAD_KEYS
+        assert META_KEYS <= set(lead["meta"])
+        assert lead["city"] == "Ahmedabad" and lead["type"] == "dental clinic"
+        assert lead["phone"] == ("+91 99999 00000" if i % 2 == 0 else None)
+        assert lead["meta"]["pitch"].startswith(f"Hi Biz {i}.")
+        assert lead["meta"]["pitch_template"] == "v1"
+        expected = f"explained {i}" if explain == "inline" else None
+        assert lead["meta"]["score"]["explanation"] == expected
+        assert saved[i]["meta"]["score"]["explanation"] == expected
+
+
+def test_competitor_radius_is_passed_and_close_releases_db(saved):
+    orch = orchestrator.Orchestrator(explain="off", competitor_radius_km=1.5)
+    results = orch.run("dental clinic", "Ahmedabad", limit=N)
+    assert {r["meta"]["competitor"]["radius_km"] for r in results} == {1.5}
+    orch.close()
+    assert orch.competitor.closed and orch.db.closed
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_deferred_saves_once_then_patches_meta(saved, meta_updates, concurrent):
+    orch = orchestrator.Orchestrator(io_workers=4, lead_workers=4, explain="deferred")
+    results = orch.run("dental clinic", "Ahmedabad", limit=N, concurrent=concurrent)
+
+    assert [r["name"] for r in results] == [f"Biz {i}" for i in range(N)]
+    assert [r["name"] for r in saved] == [r["name"] for r in results]
+    assert len(meta_updates) == 1
+    assert meta_updates[0] == [
+        (i + 1, {"$.pitch": f"Hi Biz {i}. Reply 'unsubscribe' to opt out.", "$.pitch_template": "v1",
+                 "$.score.explanation": f"explained {i}"})
+        for i in range(N)]
+    for i, lead in enumerate(results):
+        assert set(lead) == LEAD_KEYS
+        assert lead["meta"]["score"]["explanation"] == f"explained {i}"
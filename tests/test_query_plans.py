@@ -0,0 +1,75 @@
+# tests/test_query_plans.py
+"""
+Query-plan guard for the businesses table: EXPLAIN QUERY PLAN for the queries the app actually
+issues (db.crud, the Streamlit apps, CompetitorAgent) must use an index or the R*Tree, never
+scan the whole table, and not sort in a temp B-tree where an index should give the order.
+Runs on a temporary DB built from the migrations and filled with synthetic rows.
+"""
+import re
+import sqlite3
+import pytest
+from db import crud
+from db.setup_db import MIGRATIONS, migrate
+from agents.competitor_agent import _NEARBY_SQL
+
+# (label, sql, params, temp sort allowed)
+CHECKS = [
+    ("fetch_all city+type", *crud.fetch_all_sql({"city": "Ahmedabad", "type": "dental clinic"}), False),
+    ("fetch_all name prefix", *crud.fetch_all_sql({"name_prefix": "Smile"}), True),
+    ("fetch_all city+type prefix", *crud.fetch_all_sql({"city_prefix": "ahm", "type_prefix": "dent"}), True),
+    ("fetch_all type prefix", *crud.fetch_all_sql({"type_prefix": "dent"}), True),
+    ("fetch_all unfiltered", *crud.fetch_all_sql(), False),
+    ("user_app city+type", "SELECT * FROM businesses WHERE city=? AND type=? ORDER BY last_updated DESC",
+     ("Ahmedabad", "dental clinic"), False),
+    ("admin_app list", "SELECT * FROM businesses ORDER BY last_updated DESC", (), False),
+    ("find_existing", "SELECT id FROM businesses WHERE dedup_key = ?", ("smile|1 main road|2300:7255",), False),
+    ("resolve_keys", crud._CANDIDATES_SQL, ("smile|1 main road|", "smile|1 main road}"), False),
+    ("competitor nearby", _NEARBY_SQL + " AND b.type = ? COLLATE NOCASE", (23.0, 23.1, 72.5, 72.6, "dental clinic"),
+     False),
+]
+
+# "SCAN <table>" reads every row. With a WHERE clause, walking a whole index ("SCAN ... USING
+# INDEX") is a full scan too; only the unfiltered listings may do that, to get their order.
+_FULL_SCAN = re.compile(r"^SCAN \w+$")
+_INDEX_SCAN = re.compile(r"^SCAN \w+ USING (COVERING )?INDEX ")
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    conn = sqlite3.connect(str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    migrate(conn)
+    cities = ["Ahmedabad", "Surat", "Pune", "Jaipur", "Indore", "Nagpur", "Bhopal", "Vadodara"]
+    types = ["dental clinic", "gym", "cafe", "salon", "bakery", "pharmacy"]
+    with conn:
+        conn.executemany(
+            "INSERT INTO businesses (name, address, city, type, lat, lng, last_updated, dedup_key) "
+            "VALUES (?,?,?,?,?,?,?,?)",
+            [(f"Business {i}", f"{i} Main Road", cities[i % len(cities)], types[i % len(types)],
+              23.0 + (i % 100) / 1000, 72.5 + (i % 97) / 1000, f"2026-01-01T00:00:{i % 60:02d}", f"k{i}")
+             for i in range(5000)])
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+
+def full_scans(sql, steps):
+    filtered = " WHERE " in sql.upper()
+    return [s for s in steps if _FULL_SCAN.match(s) or (filtered and _INDEX_SCAN.match(s))]
+
+
+def test_schema_is_current(conn):
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+
+
+@pytest.mark.parametrize("label,sql,params,sort_ok", CHECKS, ids=[c[0] for c in CHECKS])
+def test_query_uses_an_index(conn, label, sql, params, sort_ok):
+    steps = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+    assert full_scans(sql, steps) == [], f"{label} scans the table: {steps}"
+    if not sort_ok:
+        assert not [s for s in steps if s.startswith("USE TEMP B-TREE FOR ORDER BY")], f"{label} sorts: {steps}"
+
+
+def test_full_scan_is_detected():
+    assert full_scans("SELECT * FROM businesses WHERE city LIKE ?", ["SCAN businesses USING INDEX idx_businesses_updated"])
+    assert full_scans("SELECT * FROM businesses", ["SCAN businesses"])
+    assert not full_scans("SELECT * FROM businesses", ["SCAN businesses USING INDEX idx_businesses_updated"])
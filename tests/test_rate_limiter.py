@@ -0,0 +1,69 @@
+# tests/test_rate_limiter.py
+import pytest
+from services import rate_limiter
+from services.rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_spaced(clock):
+    b = TokenBucket(rate=1.0, burst=2)
+    assert [b.reserve() for _ in range(4)] == pytest.approx([0.0, 0.0, 1.0, 2.0])
+
+
+def test_retry_after_spaces_waiters_after_block(clock):
+    b = TokenBucket(rate=1.0, burst=1)
+    b.defer(5)
+    # the first waiter goes when the block ends, the rest 1/rate apart
+    assert [b.reserve() for _ in range(4)] == pytest.approx([5.0, 6.0, 7.0, 8.0])
+
+
+def test_retry_after_spacing_follows_rate(clock):
+    b = TokenBucket(rate=2.0, burst=3)
+    b.defer(5)
+    assert [b.reserve() for _ in range(3)] == pytest.approx([5.0, 5.5, 6.0])
+
+
+def test_block_ends_and_bucket_refills(clock):
+    b = TokenBucket(rate=1.0, burst=1)
+    b.defer(5)
+    clock[0] += 10
+    assert b.reserve() == pytest.approx(0.0)
+
+
+def test_shorter_defer_does_not_shorten_block(clock):
+    b = TokenBucket(rate=1.0, burst=1)
+    b.defer(5)
+    b.defer(1)
+    assert b.reserve() == pytest.approx(5.0)
+
+
+def test_set_budget_while_looking_up_hosts():
+    import threading
+    stop = threading.Event()
+    errors = []
+
+    def lookup():
+        while not stop.is_set():
+            try:
+                rate_limiter._budget_key("www.example.org")
+            except RuntimeError as e:
+                errors.append(e)
+                return
+
+    t = threading.Thread(target=lookup)
+    t.start()
+    try:
+        for i in range(2000):
+            rate_limiter.set_budget(f"host{i}.test", 1.0)
+    finally:
+        stop.set()
+        t.join()
+        for i in range(2000):
+            rate_limiter.BUDGETS.pop(f"host{i}.test", None)
+    assert errors == []
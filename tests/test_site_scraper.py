@@ -0,0 +1,45 @@
+# tests/test_site_scraper.py
+import datetime
+import pytest
+
+site_scraper = pytest.importorskip("services.site_scraper")
+
+
+class FakeResponse:
+    def __init__(self, text, url="https://example.com/"):
+        self.text = text
+        self.content = text.encode()
+        self.url = url
+        self.status_code = 200
+        self.headers = {}
+        self.elapsed = datetime.timedelta(milliseconds=120)
+
+
+class FakePages:
+    def __init__(self, text):
+        self.page = site_scraper.Page("https://example.com/", FakeResponse(text))
+
+    def get(self, url, timeout=None):
+        return self.page
+
+
+def test_empty_body_is_an_issue_not_a_crash():
+    health = site_scraper.compute_basic_site_health("https://example.com/", pages=FakePages(""))
+    assert health["score"] == 0
+    assert health["issues"] == ["Website returned an empty page"]
+    assert health["status_code"] == 200
+
+
+def test_empty_body_has_no_contacts():
+    assert site_scraper.extract_emails_and_phones("https://example.com/", pages=FakePages("")) == ([], [])
+
+
+def test_full_page_health():
+    html = ("<html><head><title>Clinic</title><meta name='description' content='x'>"
+            "<meta name='viewport' content='width=device-width'></head><body><h1>Hi</h1>"
+            "<a href='mailto:info@example.com'>mail</a></body></html>")
+    pages = FakePages(html)
+    health = site_scraper.compute_basic_site_health("https://example.com/", pages=pages)
+    assert health["score"] == 100 and health["issues"] == []
+    emails, _ = site_scraper.extract_emails_and_phones("https://example.com/", pages=pages)
+    assert emails == ["info@example.com"]
@@ -0,0 +1,24 @@
+# tests/test_spatial.py
+from utils.spatial import PlaceIndex, M_PER_DEG_LAT
+
+
+def test_honorific_and_leading_token_do_not_split_blocks():
+    index = PlaceIndex()
+    index.add({"name": "Dr. Shah Dental Clinic", "lat": 23.0300, "lng": 72.5600}, "google")
+    rec, merged = index.add({"name": "Shah Dental Clinic", "lat": 23.0300 + 11 / M_PER_DEG_LAT, "lng": 72.5600}, "osm")
+    assert merged and len(index) == 1
+    assert [s["source"] for s in rec["sources"]] == ["google", "osm"]
+
+
+def test_different_businesses_nearby_stay_apart():
+    index = PlaceIndex()
+    index.add({"name": "Shah Dental Clinic", "lat": 23.03, "lng": 72.56}, "google")
+    index.add({"name": "Patel Eye Hospital", "lat": 23.03, "lng": 72.56}, "google")
+    assert len(index) == 2
+
+
+def test_same_place_id_merges():
+    index = PlaceIndex()
+    index.add({"place_id": "abc", "name": "Smile Care", "lat": 23.03, "lng": 72.56}, "google")
+    _, merged = index.add({"place_id": "abc", "name": "Smile Care Dental Studio", "lat": 23.04, "lng": 72.56}, "google")
+    assert merged and len(index) == 1
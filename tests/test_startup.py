@@ -0,0 +1,54 @@
+# tests/test_startup.py
+"""
+Startup latency guard: imports each entry module in a fresh interpreter and fails when the
+import breaks, takes longer than IMPORT_BUDGET_MS, or pulls in one of the heavy libraries that
+must only load on first use (model / scraper stacks). `python main.py --help` gets its own
+budget (HELP_BUDGET_MS).
+Use `python -X importtime -c "import agents.orchestrator"` to see where the time goes.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import pytest
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1500"))
+HELP_BUDGET_MS = int(os.getenv("HELP_BUDGET_MS", "500"))
+
+# must not be imported just by importing the app modules
+HEAVY = ["torch", "transformers", "optimum", "onnxruntime", "instaloader", "facebook_scraper", "snscrape", "pandas"]
+MODULES = ["main", "agents.orchestrator", "agents.discovery_agent"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": ms, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(module):
+    code = _PROBE.format(module=module, heavy=HEAVY)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    # a module that cannot be imported is broken, not fast
+    assert proc.returncode == 0, f"import {module} failed:\n{proc.stderr.strip()}"
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_is_fast_and_light(module):
+    res = probe(module)
+    assert res["heavy"] == [], f"import {module} pulls in {', '.join(res['heavy'])}"
+    assert res["ms"] <= BUDGET_MS, f"import {module}: {res['ms']:.0f} ms > {BUDGET_MS} ms"
+
+
+def test_main_help_is_fast():
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "main.py", "--help"], cwd=ROOT, capture_output=True, text=True)
+    ms = (time.perf_counter() - t0) * 1000
+    assert proc.returncode == 0, proc.stderr
+    assert ms <= HELP_BUDGET_MS, f"main.py --help: {ms:.0f} ms > {HELP_BUDGET_MS} ms"
@@ -0,0 +1,61 @@
+# tests/test_utils_db.py
+import threading
+import pytest
+
+udb = pytest.importorskip("utils.db")
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db import density
+
+LEAD = {"name": "Smile Dental", "address": "12 CG Road, Navrangpura", "city": "Ahmedabad", "type": "dental clinic",
+        "lat": 23.00999, "lng": 72.56}
+
+
+@pytest.fixture
+def Session(temp_db):
+    engine = create_engine(f"sqlite:///{temp_db}", connect_args={"check_same_thread": False, "timeout": 30})
+    udb.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def test_upsert_merges_meta_and_matches_across_cell_edge(Session):
+    session = Session()
+    b, created = udb.upsert_business(session, {**LEAD, "meta": {"score": {"opportunity_score": 50}, "note": "x"}})
+    assert created and b.source == "composite" and b.meta["note"] == "x"
+    b2, created = udb.upsert_business(session, {**LEAD, "lat": 23.01001, "meta": {"score": {"opportunity_score": 80}}})
+    assert not created and b2.id == b.id
+    assert b2.meta["score"] == {"opportunity_score": 80} and b2.meta["note"] == "x"
+    b3, created = udb.upsert_business(session, {**LEAD, "lat": None, "lng": None})
+    assert not created and b3.id == b.id and b3.lat == 23.01001
+    assert udb.find_existing(session, LEAD["name"], LEAD["address"]).id == b.id
+    assert session.query(udb.Business).count() == 1
+    assert density.get_grid("Ahmedabad", "dental clinic").total == 1
+    session.close()
+
+
+def test_racing_upserts_make_one_row(Session):
+    barrier = threading.Barrier(6)
+    results, errors = [], []
+
+    def worker(i):
+        session = Session()
+        try:
+            barrier.wait()
+            b, created = udb.upsert_business(session, {**LEAD, "meta": {f"k{i}": i}})
+            results.append((b.id, created))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len({bid for bid, _ in results}) == 1 and sum(c for _, c in results) == 1
+    session = Session()
+    assert set(session.query(udb.Business).one().meta) >= {f"k{i}" for i in range(6)}
+    session.close()
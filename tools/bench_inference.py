@@ -0,0 +1,100 @@
+# tools/bench_inference.py
+"""
+Compare LLM inference backends (utils/model_registry.py) on pitch-style prompts.
+Each backend runs in its own subprocess so peak RSS is measured per backend.
+Reports load time, generated tokens/sec, peak RSS and how many outputs match the torch backend.
+Usage:
+    python tools/bench_inference.py --backends torch,int8,onnx --n 16 --batch-size 8
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# ensure project root on sys.path for utils imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+ISSUES = [
+    ["Website does not use HTTPS", "Missing meta description"],
+    ["Not mobile friendly (no viewport meta tag)"],
+    ["Slow page load (4200 ms)", "No H1 heading", "Low Facebook followers: 120"],
+    ["Missing page title", "Instagram last post: 2023-01-04"],
+    [],
+]
+
+
+def sample_prompts(n):
+    from agents.pitch_agent import PitchAgent
+    out = []
+    for i in range(n):
+        business = {"name": f"Sample Clinic {i}"}
+        findings = {"site_health": {"issues": ISSUES[i % len(ISSUES)]}}
+        out.append(PitchAgent._build_prompt(business, findings))
+    return out
+
+
+def worker(args):
+    from utils import model_registry
+    prompts = sample_prompts(args.n)
+    handle = model_registry.acquire(args.model, args.backend)
+    t0 = time.perf_counter()
+    handle.model  # force the load (and ONNX export on first use)
+    load_s = time.perf_counter() - t0
+    # warm-up outside the timed section
+    model_registry.generate_batch(handle, prompts[:1], max_new_tokens=8)
+    t0 = time.perf_counter()
+    outputs = model_registry.generate_batch(handle, prompts, max_new_tokens=args.max_new_tokens, batch_size=args.batch_size)
+    gen_s = time.perf_counter() - t0
+    tokens = sum(len(handle.tokenizer(o)["input_ids"]) for o in outputs)
+    print(json.dumps({
+        "backend": handle.backend,
+        "load_s": round(load_s, 2),
+        "gen_s": round(gen_s, 2),
+        "tokens": tokens,
+        "tokens_per_s": round(tokens / gen_s, 1) if gen_s else None,
+        # ru_maxrss is KB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "outputs": outputs,
+    }))
+
+
+def main(args):
+    results = []
+    for backend in args.backends.split(","):
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--backend", backend, "--model", args.model,
+               "--n", str(args.n), "--batch-size", str(args.batch_size), "--max-new-tokens", str(args.max_new_tokens)]
+        print(f"Running {backend} ...")
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"  {backend} failed:\n{proc.stderr.strip()[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    if not results:
+        return
+    baseline = next((r["outputs"] for r in results if r["backend"] == "torch"), None)
+    print(f"\n{'backend':<8} {'load s':>8} {'gen s':>8} {'tok/s':>8} {'peak MB':>9} {'= torch':>8}")
+    for r in results:
+        same = "-"
+        if baseline is not None:
+            same = f"{sum(a == b for a, b in zip(r['outputs'], baseline))}/{len(baseline)}"
+        print(f"{r['backend']:<8} {r['load_s']:>8} {r['gen_s']:>8} {r['tokens_per_s']:>8} {r['peak_rss_mb']:>9} {same:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", default="torch,int8,onnx")
+    parser.add_argument("--model", default="google/flan-t5-small")
+    parser.add_argument("--n", type=int, default=16, help="number of prompts")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=120)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", default="torch", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+    else:
+        main(args)
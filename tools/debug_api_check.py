@@ -6,6 +6,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from utils.config import get_api_key, get_dotenv_path, where_key_came_from
+from services import geocoder
 
 def masked(s):
     if not s:
@@ -62,15 +63,12 @@ def test_geoapify(query="dental clinic Ahmedabad"):
 
 def geocode_city(city="Ahmedabad"):
     print_header("Nominatim Geocode")
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": city, "format": "json", "limit": 1}
     try:
-        r = requests.get(url, params=params, headers={"User-Agent": os.getenv("USER_AGENT","ai-business-intel-bot/1.0")}, timeout=10)
-        print("HTTP", r.status_code)
-        j = r.json()
-        print("results:", len(j))
-        if j:
-            print("lat, lon:", j[0].get("lat"), j[0].get("lon"))
+        rec = geocoder.geocode(city)
+        if rec:
+            print("lat, lon:", rec["lat"], rec["lon"], "| source:", rec["source"])
+        else:
+            print("results: 0")
     except Exception as e:
         print("Nominatim error:", e)
 
@@ -0,0 +1,33 @@
+# tools/rescore_leads.py
+"""
+Re-score every lead in data/businesses.db with the current (or overridden) scoring weights.
+Usage:
+    python tools/rescore_leads.py
+    python tools/rescore_leads.py --weights '{"site": 0.5, "high": 65}' --dry-run
+    python tools/rescore_leads.py --competitors grid --rebuild-grids
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# ensure project root on sys.path for agents/db imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from agents.scoring_agent import ScoringAgent
+from db import density
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=None, help="JSON object merged over SCORING_WEIGHTS")
+    parser.add_argument("--dry-run", action="store_true", help="score and report without writing")
+    parser.add_argument("--competitors", choices=["stored", "grid"], default="stored",
+                        help="competitor counts from meta (stored) or the density grids (grid)")
+    parser.add_argument("--radius_km", type=float, default=2.0)
+    parser.add_argument("--rebuild-grids", action="store_true", help="rebuild all density grids first")
+    args = parser.parse_args()
+    if args.rebuild_grids:
+        print(f"Built {len(density.build())} density grids")
+    result = ScoringAgent().run(weights=json.loads(args.weights) if args.weights else None, dry_run=args.dry_run,
+                                competitors=args.competitors, radius_km=args.radius_km)
+    print(json.dumps(result, indent=2))
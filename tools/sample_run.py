@@ -19,7 +19,10 @@ from utils.db import SessionLocal, fetch_all_businesses
 def main(btype, city, limit):
     print("Starting local debug run")
     orch = Orchestrator()
-    results = orch.run(btype, city, limit=limit, radius_km=5, language="en")
+    try:
+        results = orch.run(btype, city, limit=limit, radius_km=5, language="en")
+    finally:
+        orch.close()
     print(f"\n--- DISCOVERED {len(results)} LEADS (printed) ---\n")
     for i, lead in enumerate(results, 1):
         print(f"LEAD #{i}")
@@ -1,9 +1,11 @@
 # utils/db.py
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, JSON, Text, event
+from sqlalchemy import create_engine, Column, Integer, String, Float, JSON, Text, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timezone
+from db import crud
+from db.setup_db import migrate
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__)) if os.path.dirname(__file__) else "."
 DB_PATH = os.path.join(BASE_DIR, "data", "businesses.db")
@@ -35,50 +37,71 @@ class Business(Base):
     lng = Column(Float)
     address = Column(Text)
     source = Column(String)
+    city = Column(String)
+    type = Column(String)
     meta = Column(JSON, default={})
+    # UNIQUE index added by db/setup_db.py migration 5
+    dedup_key = Column(String)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # dedup_key index, R*Tree triggers, density grids (db/setup_db.py); upserts rely on them
+    raw = engine.raw_connection()
+    try:
+        migrate(raw.dbapi_connection)
+    finally:
+        raw.close()
+
+def _dbapi(session):
+    # the session's own sqlite3 connection, so db.crud statements join its transaction
+    return session.connection().connection.dbapi_connection
 
-def find_existing(session, name, address):
-    q = session.query(Business).filter(Business.name == name).all()
-    for r in q:
-        if r.address and address and address.split(",")[0].strip().lower() in r.address.lower():
-            return r
-    return q[0] if q else None
+def find_existing(session, name, address, lat=None, lng=None):
+    # same duplicate rule as db.crud (dedup_key index, tolerant of geocell edges / missing coords)
+    bid = crud.find_existing(_dbapi(session), name, address, lat, lng)
+    return session.get(Business, bid) if bid else None
 
 def upsert_business(session, lead):
-    existing = find_existing(session, lead.get("name") or "", lead.get("address") or "")
+    """
+    Insert or update a lead through db.crud's INSERT ... ON CONFLICT(dedup_key) DO UPDATE, on the
+    session's connection. meta is merged key by key into the stored meta.
+    Returns (Business, created_bool).
+    """
     meta = lead.get("meta") or {}
     # flatten known fields into meta
     for k in ["email","phone","instagram","linkedin","website","score"]:
         if k not in meta:
             meta[k] = lead.get(k) or lead.get("meta", {}).get(k)
-    if existing:
-        existing.meta = {**(existing.meta or {}), **meta}
-        if not existing.lat and lead.get("lat"):
-            existing.lat = lead.get("lat")
-        if not existing.lng and lead.get("lng"):
-            existing.lng = lead.get("lng")
-        if not existing.address and lead.get("address"):
-            existing.address = lead.get("address")
-        session.add(existing)
-        session.commit()
-        session.refresh(existing)
-        return existing, False
-    else:
-        b = Business(
-            name = lead.get("name"),
-            lat = lead.get("lat"),
-            lng = lead.get("lng"),
-            address = lead.get("address"),
-            source = lead.get("source", "composite"),
-            meta = meta
-        )
-        session.add(b)
-        session.commit()
-        session.refresh(b)
-        return b, True
+    row = {**lead, "source": lead.get("source") or "composite", "meta": meta}
+    conn = _dbapi(session)
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        (bid, created), = crud.upsert_rows(conn, [row])
+        conn.commit()
+        crud.note_created(conn, [row], [(bid, created)])
+    except Exception:
+        session.rollback()
+        raise
+    session.commit()
+    return session.get(Business, bid, populate_existing=True), created
+
+def update_meta(session, updates):
+    """
+    Set individual JSON paths inside meta without rewriting the row, in one transaction:
+    updates = [(business_id, {"$.score.explanation": "...", ...}), ...].
+    """
+    groups = {}
+    for bid, fields in updates:
+        params = {f"v{i}": v for i, v in enumerate(fields.values())}
+        groups.setdefault(tuple(fields), []).append({"id": bid, **params})
+    for paths, rows in groups.items():
+        # paths are code constants, only the values are bound
+        sets = ", ".join(f"'{p}', :v{i}" for i, p in enumerate(paths))
+        session.execute(text(f"UPDATE businesses SET meta = json_set(COALESCE(meta, '{{}}'), {sets}) WHERE id = :id"), rows)
+    session.commit()
+    # ORM copies of these rows still hold the old meta
+    session.expire_all()
 
 def fetch_all(session):
     rows = session.query(Business).all()
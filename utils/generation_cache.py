@@ -0,0 +1,129 @@
+# utils/generation_cache.py
+"""
+Persistent cache for local model outputs (data/cache.db, table `generations`).
+Entries are content addressed: the key is a sha256 of (model name, generation params, prompt),
+so the same prompt on the same model and settings is decoded only once across runs.
+- LRU eviction by entry count (GEN_CACHE_MAX_ENTRIES)
+- bypass with GEN_CACHE_BYPASS=1, by setting BYPASS = True, or per call with bypass=True
+On a full hit the model is never touched (handles load lazily, see utils/model_registry.py).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from db.helpers import get_cache_connection
+
+MAX_ENTRIES = int(os.getenv("GEN_CACHE_MAX_ENTRIES", "20000"))
+BYPASS = os.getenv("GEN_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+# SQLite host-parameter limit is 999 on older builds
+_CHUNK = 500
+
+_lock = threading.Lock()
+_conn = None
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "evicted": 0}
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = get_cache_connection()
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                output TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_access ON generations(last_access)")
+        _conn.commit()
+    return _conn
+
+
+def make_key(model, params, prompt):
+    raw = json.dumps([model, params or {}, prompt], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf8")).hexdigest()
+
+
+def _lookup(keys):
+    found = {}
+    keys = list(keys)
+    now = time.time()
+    with _lock:
+        conn = _db()
+        for i in range(0, len(keys), _CHUNK):
+            chunk = keys[i:i + _CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for key, output in conn.execute(f"SELECT key, output FROM generations WHERE key IN ({marks})", chunk):
+                found[key] = output
+        if found:
+            conn.executemany("UPDATE generations SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+            conn.commit()
+    return found
+
+
+def _evict(conn):
+    total = conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+    if total <= MAX_ENTRIES:
+        return
+    n = total - MAX_ENTRIES
+    conn.execute("DELETE FROM generations WHERE key IN (SELECT key FROM generations ORDER BY last_access LIMIT ?)", (n,))
+    _stats["evicted"] += n
+
+
+def _store(model, outputs):
+    now = time.time()
+    with _lock:
+        conn = _db()
+        conn.executemany("INSERT OR REPLACE INTO generations VALUES (?,?,?,?,?)",
+                         [(key, model, out, now, now) for key, out in outputs.items()])
+        _evict(conn)
+        conn.commit()
+        _stats["stored"] += len(outputs)
+
+
+def generate(model, params, prompts, fn, bypass=False):
+    """
+    Return one output per prompt, in order. Only prompts missing from the cache (de-duplicated)
+    are passed to fn(list_of_prompts) -> list_of_outputs; its results are stored.
+    """
+    prompts = list(prompts)
+    if not prompts:
+        return []
+    if bypass or BYPASS:
+        with _lock:
+            _stats["bypassed"] += len(prompts)
+        return fn(prompts)
+    keys = [make_key(model, params, p) for p in prompts]
+    found = _lookup(set(keys))
+    missing = {}
+    for key, prompt in zip(keys, prompts):
+        if key not in found:
+            missing.setdefault(key, prompt)
+    misses = sum(1 for key in keys if key in missing)
+    with _lock:
+        _stats["hits"] += len(prompts) - misses
+        _stats["misses"] += misses
+    if missing:
+        fresh = dict(zip(missing, fn(list(missing.values()))))
+        _store(model, fresh)
+        found.update(fresh)
+    return [found[key] for key in keys]
+
+
+def stats():
+    """Counters since process start plus hit_rate and the current entry count."""
+    with _lock:
+        out = dict(_stats)
+        out["entries"] = _db().execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+    looked_up = out["hits"] + out["misses"]
+    out["hit_rate"] = round(out["hits"] / looked_up, 3) if looked_up else 0.0
+    return out
+
+
+def clear():
+    with _lock:
+        _db().execute("DELETE FROM generations")
+        _db().commit()
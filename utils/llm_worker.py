@@ -0,0 +1,213 @@
+# utils/llm_worker.py
+"""
+Long-lived local inference worker, so Streamlit sessions, CLI runs and tools share one copy
+of each model instead of loading their own.
+
+Server:  python -m utils.llm_worker [--host 127.0.0.1] [--port 8765]
+  POST /generate {"model", "backend", "prompts": [...], "max_new_tokens"} -> {"outputs": [...]}
+  GET  /health   -> {"ok": true, "models": model_registry.stats()}
+  Requests from all clients go through one queue. The dispatcher waits up to
+  LLM_WORKER_BATCH_WAIT_MS for more work, then runs everything with the same
+  (model, backend, max_new_tokens) as one generate_batch call.
+
+Client:  generate(handle, prompts, ...) sends to the worker at LLM_WORKER_URL when it answers,
+  otherwise runs model_registry.generate_batch in-process. LLM_WORKER=off disables the worker.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import model_registry
+
+WORKER_URL = os.getenv("LLM_WORKER_URL", "http://127.0.0.1:8765")
+MODE = os.getenv("LLM_WORKER", "auto").lower()  # auto | off
+BATCH_WAIT = float(os.getenv("LLM_WORKER_BATCH_WAIT_MS", "25")) / 1000
+REQUEST_TIMEOUT = float(os.getenv("LLM_WORKER_TIMEOUT", "600"))
+# how long a health check result is trusted before probing the worker again
+RETRY_AFTER = 30.0
+
+
+# ---------------------------------------------------------------- server
+
+class _Job:
+    def __init__(self, model, backend, prompts, max_new_tokens):
+        self.key = (model, backend, max_new_tokens)
+        self.prompts = prompts
+        self.outputs = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batcher:
+    """Single dispatcher thread that merges concurrent jobs into model batches."""
+
+    def __init__(self, batch_size=None, wait=BATCH_WAIT):
+        self.batch_size = batch_size or model_registry.BATCH_SIZE
+        self.wait = wait
+        self._queue = queue.Queue()
+        self._handles = {}
+        self.stats = {"requests": 0, "prompts": 0, "batches": 0}
+        threading.Thread(target=self._loop, name="llm-worker-batcher", daemon=True).start()
+
+    def submit(self, model, backend, prompts, max_new_tokens):
+        job = _Job(model, backend, prompts, max_new_tokens)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error:
+            raise RuntimeError(job.error)
+        return job.outputs
+
+    def _handle(self, model, backend):
+        h = self._handles.get((model, backend))
+        if h is None:
+            # held for the worker's lifetime
+            h = self._handles[(model, backend)] = model_registry.acquire(model, backend)
+        return h
+
+    def _collect(self):
+        jobs = [self._queue.get()]
+        deadline = time.monotonic() + self.wait
+        while sum(len(j.prompts) for j in jobs) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return jobs
+
+    def _loop(self):
+        while True:
+            groups = {}
+            for job in self._collect():
+                groups.setdefault(job.key, []).append(job)
+            for (model, backend, max_new_tokens), jobs in groups.items():
+                prompts = [p for j in jobs for p in j.prompts]
+                try:
+                    outputs = model_registry.generate_batch(self._handle(model, backend), prompts,
+                                                            max_new_tokens=max_new_tokens, batch_size=self.batch_size)
+                except Exception as e:
+                    outputs = None
+                    for j in jobs:
+                        j.error = f"{type(e).__name__}: {e}"
+                self.stats["requests"] += len(jobs)
+                self.stats["prompts"] += len(prompts)
+                self.stats["batches"] += 1
+                pos = 0
+                for j in jobs:
+                    if outputs is not None:
+                        j.outputs = outputs[pos:pos + len(j.prompts)]
+                    pos += len(j.prompts)
+                    j.done.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"ok": True, "models": model_registry.stats(), "batcher": self.batcher.stats})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            outputs = self.batcher.submit(req["model"], req.get("backend") or model_registry.BACKEND,
+                                          list(req["prompts"]), int(req.get("max_new_tokens", 128)))
+            self._reply(200, {"outputs": outputs})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8765, batch_size=None, preload=()):
+    _Handler.batcher = Batcher(batch_size)
+    for name in preload:
+        _Handler.batcher._handle(name, model_registry.BACKEND).model
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    print(f"[LLMWorker] serving on http://{host}:{port} (backend {model_registry.BACKEND})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# ---------------------------------------------------------------- client
+
+_state = {"down_until": 0.0, "up_until": 0.0}
+_stats = {"remote": 0, "local": 0, "failures": 0}
+_lock = threading.Lock()
+
+
+def _worker_up():
+    now = time.monotonic()
+    if MODE == "off" or now < _state["down_until"]:
+        return False
+    if now < _state["up_until"]:
+        return True
+    from services import http_client
+    try:
+        up = http_client.get(WORKER_URL + "/health", timeout=1).ok
+    except Exception:
+        up = False
+    _state["up_until" if up else "down_until"] = now + RETRY_AFTER
+    return up
+
+
+def generate(handle, prompts, max_new_tokens=128, batch_size=None):
+    """Same contract as model_registry.generate_batch; served by the worker when it is running."""
+    if prompts and _worker_up():
+        from services import http_client
+        try:
+            r = http_client.post(WORKER_URL + "/generate", timeout=REQUEST_TIMEOUT, json={
+                "model": handle.name, "backend": handle.backend,
+                "prompts": list(prompts), "max_new_tokens": max_new_tokens})
+            r.raise_for_status()
+            with _lock:
+                _stats["remote"] += len(prompts)
+            return r.json()["outputs"]
+        except Exception as e:
+            print(f"[LLMWorker] worker request failed ({e}), generating in-process")
+            with _lock:
+                _stats["failures"] += 1
+            _state["up_until"] = 0.0
+            _state["down_until"] = time.monotonic() + RETRY_AFTER
+    with _lock:
+        _stats["local"] += len(prompts)
+    return model_registry.generate_batch(handle, prompts, max_new_tokens=max_new_tokens, batch_size=batch_size)
+
+
+def stats():
+    with _lock:
+        return dict(_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--preload", default="", help="comma separated model names to load at startup")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.batch_size, [m for m in args.preload.split(",") if m])
@@ -0,0 +1,261 @@
+# utils/model_registry.py
+"""
+Process-wide registry for the local seq2seq models (tokenizer + model pairs).
+Agents acquire a handle by model name; every handle for the same name shares one
+tokenizer and one model instance, loaded lazily on first use and reference counted.
+Because the registry lives at module level it also survives Streamlit reruns, so a new
+Orchestrator() per button click does not load the weights again.
+
+Inference backend (LLM_BACKEND, or per acquire(name, backend=...)):
+- "torch": stock PyTorch fp32 (default)
+- "int8": torch dynamic int8 quantization of the Linear layers, CPU only
+- "onnx": ONNX Runtime via optimum; exported once to data/models/<name>-onnx and reused.
+  Falls back to "torch" when optimum[onnxruntime] is not installed.
+"""
+import importlib.util
+import os
+import threading
+import time
+
+BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+BACKENDS = ("torch", "int8", "onnx")
+BACKEND = os.getenv("LLM_BACKEND", "torch").lower()
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "models")
+
+
+def _rss_mb():
+    """Current resident set size in MB (psutil if installed, else /proc, else peak RSS)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except Exception:
+        return 0.0
+
+
+def onnx_available():
+    try:
+        return importlib.util.find_spec("optimum.onnxruntime") is not None
+    except ImportError:
+        return False
+
+
+def onnx_dir(name):
+    return os.path.join(MODELS_DIR, name.replace("/", "__") + "-onnx")
+
+
+def _load_torch(name, quantize=False):
+    from transformers import AutoModelForSeq2SeqLM
+    import torch
+    model = AutoModelForSeq2SeqLM.from_pretrained(name)
+    if quantize:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        device = torch.device("cpu")
+    else:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    model.eval()
+    return model, device
+
+
+def _load_onnx(name):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    import torch
+    path = onnx_dir(name)
+    if os.path.exists(os.path.join(path, "config.json")):
+        model = ORTModelForSeq2SeqLM.from_pretrained(path)
+    else:
+        print(f"[ModelRegistry] Exporting {name} to ONNX at {path} (one-time)...")
+        model = ORTModelForSeq2SeqLM.from_pretrained(name, export=True)
+        model.save_pretrained(path)
+    return model, torch.device("cpu")
+
+
+def _param_mb(model):
+    try:
+        return round(sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024), 1)
+    except Exception:
+        # ORT models (and quantized packed weights) don't expose torch parameters
+        return None
+
+
+class _Entry:
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.refs = 0
+        self.tokenizer = None
+        self.model = None
+        self.device = None
+        self.load_seconds = None
+        self.rss_delta_mb = None
+        self.param_mb = None
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+
+class ModelHandle:
+    """What agents hold: resolves tokenizer/model/device through the registry on first access."""
+
+    def __init__(self, registry, name, backend):
+        self._registry = registry
+        self.name = name
+        self.backend = backend
+        self._released = False
+
+    @property
+    def cache_id(self):
+        """Model identity for output caches: backends may differ in the last decimal places."""
+        return self.name if self.backend == "torch" else f"{self.name}#{self.backend}"
+
+    def _entry(self):
+        return self._registry.load(self.name, self.backend)
+
+    @property
+    def tokenizer(self):
+        return self._entry().tokenizer
+
+    @property
+    def model(self):
+        return self._entry().model
+
+    @property
+    def device(self):
+        return self._entry().device
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._registry.release(self.name, self.backend)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get_entry(self, name, backend):
+        with self._lock:
+            e = self._entries.get((name, backend))
+            if e is None:
+                e = self._entries[(name, backend)] = _Entry(name, backend)
+            return e
+
+    def acquire(self, name, backend=None):
+        """Take a reference to `name`; nothing is loaded until the handle is used."""
+        backend = (backend or BACKEND).lower()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LLM backend {backend!r}, expected one of {BACKENDS}")
+        if backend == "onnx" and not onnx_available():
+            print("[ModelRegistry] optimum[onnxruntime] not installed, using the torch backend")
+            backend = "torch"
+        e = self._get_entry(name, backend)
+        with e.lock:
+            e.refs += 1
+        return ModelHandle(self, name, backend)
+
+    def load(self, name, backend="torch"):
+        """Load `name` with `backend` once (thread-safe) and return its entry."""
+        e = self._get_entry(name, backend)
+        if e.loaded:
+            return e
+        with e.lock:
+            if not e.loaded:
+                from transformers import AutoTokenizer
+                print(f"[ModelRegistry] Loading {name} [{backend}] (may take a moment)...")
+                rss_before = _rss_mb()
+                t0 = time.perf_counter()
+                tokenizer = AutoTokenizer.from_pretrained(name)
+                if backend == "onnx":
+                    model, device = _load_onnx(name)
+                else:
+                    model, device = _load_torch(name, quantize=backend == "int8")
+                e.tokenizer, e.model, e.device = tokenizer, model, device
+                e.load_seconds = round(time.perf_counter() - t0, 2)
+                e.rss_delta_mb = round(_rss_mb() - rss_before, 1)
+                e.param_mb = _param_mb(model)
+                print(f"[ModelRegistry] Loaded {name} [{backend}] in {e.load_seconds}s (+{e.rss_delta_mb} MB RSS)")
+        return e
+
+    def release(self, name, backend="torch"):
+        e = self._get_entry(name, backend)
+        with e.lock:
+            e.refs = max(0, e.refs - 1)
+
+    def unload_unused(self):
+        """Drop models nobody holds a reference to. Returns the names unloaded."""
+        dropped = []
+        with self._lock:
+            entries = list(self._entries.values())
+        for e in entries:
+            with e.lock:
+                if e.refs == 0 and e.loaded:
+                    e.tokenizer = e.model = e.device = None
+                    dropped.append(e.name)
+        if dropped:
+            try:
+                import gc
+                gc.collect()
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except Exception:
+                pass
+        return dropped
+
+    def stats(self):
+        """{"name[backend]": {"refs", "loaded", "load_seconds", "rss_delta_mb", "param_mb"}} plus current rss_mb."""
+        with self._lock:
+            entries = list(self._entries.items())
+        out = {f"{name}[{backend}]": {"refs": e.refs, "loaded": e.loaded, "load_seconds": e.load_seconds,
+                                      "rss_delta_mb": e.rss_delta_mb, "param_mb": e.param_mb}
+               for (name, backend), e in entries}
+        return {"models": out, "rss_mb": round(_rss_mb(), 1)}
+
+
+# the process-wide instance
+registry = ModelRegistry()
+
+
+def acquire(name, backend=None):
+    return registry.acquire(name, backend)
+
+
+def stats():
+    return registry.stats()
+
+
+def generate_batch(handle, prompts, max_new_tokens=128, batch_size=None):
+    """
+    Run model.generate over many prompts. Prompts are tokenized once, sorted by length and
+    padded per bucket of `batch_size` (so short prompts are not padded to the longest one);
+    outputs come back in input order.
+    """
+    if not prompts:
+        return []
+    import torch
+    tok, model, device = handle.tokenizer, handle.model, handle.device
+    batch_size = batch_size or BATCH_SIZE
+    enc = tok(list(prompts), truncation=True)
+    order = sorted(range(len(prompts)), key=lambda i: len(enc["input_ids"][i]))
+    out = [None] * len(prompts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        batch = tok.pad({k: [enc[k][i] for i in idx] for k in enc.keys()}, return_tensors="pt").to(device)
+        with torch.no_grad():
+            gen = model.generate(**batch, max_new_tokens=max_new_tokens)
+        for i, text in zip(idx, tok.batch_decode(gen, skip_special_tokens=True)):
+            out[i] = text
+    return out
@@ -0,0 +1,74 @@
+# utils/pitch_templates.py
+"""
+Versioned outreach templates for PitchAgent's template mode.
+A pitch is rendered from structured findings (site-health issues, Instagram recency,
+Facebook followers) without a model call; an optional one-line personalization from the
+LLM goes into the {personal} slot. Add a new version instead of editing a released one,
+so stored pitches (meta.pitch_template) can be traced back to the text that produced them.
+Every version must pass ComplianceAgent: an opt-out line, no spam keywords, < 1200 chars.
+"""
+import os
+
+DEFAULT_VERSION = os.getenv("PITCH_TEMPLATE", "v1")
+MAX_ISSUES = 4
+
+TEMPLATES = {
+    "v1": {
+        "greeting": "Hi {name} team,",
+        "intro": "I had a quick look at {name}'s online presence and noticed a few things that may be costing you enquiries:",
+        "issue": "- {issue}",
+        "no_issues": "Your website is in good shape, and there is still room to reach more local customers online.",
+        "value": ("We help local businesses fix exactly these points and turn their website and social pages "
+                  "into a steady source of new customers."),
+        "cta": "Would you be open to a 15-minute call this week?",
+        "signoff": "Best regards",
+        "optout": "If you would rather not hear from us, reply 'unsubscribe' and we will not contact you again.",
+    },
+}
+
+# site-health issue prefix (services/site_scraper.py) -> customer-facing wording
+ISSUE_PHRASES = [
+    ("Website unreachable", "Your website could not be reached when we checked."),
+    ("Website returned an empty page", "Your website loads as a blank page, so visitors see nothing."),
+    ("Website does not use HTTPS", "Your website is not served over HTTPS, so browsers mark it as not secure."),
+    ("Slow page load", "Your homepage loads slowly, and many visitors leave before it finishes."),
+    ("Missing page title", "Your homepage has no page title, which hurts how it shows up in search results."),
+    ("Missing meta description", "Your homepage has no search description, so search engines show a random snippet."),
+    ("Not mobile friendly", "Your website is not set up for phones, where most local searches happen."),
+    ("No H1 heading", "Your homepage has no main heading, which makes it harder for search engines to understand."),
+]
+
+
+def issue_lines(findings):
+    """Customer-facing issue sentences from aggregated findings, most important first."""
+    lines = []
+    for issue in findings.get("site_health", {}).get("issues") or []:
+        phrase = next((p for prefix, p in ISSUE_PHRASES if issue.startswith(prefix)), None)
+        if phrase and phrase not in lines:
+            lines.append(phrase)
+    social = findings.get("social") or {}
+    ig = social.get("instagram")
+    if isinstance(ig, dict) and ig.get("last_post"):
+        lines.append(f"Your last Instagram post was on {str(ig['last_post'])[:10]}.")
+    fb = social.get("facebook")
+    if isinstance(fb, dict) and isinstance(fb.get("followers"), int) and fb["followers"] < 200:
+        lines.append(f"Your Facebook page has {fb['followers']} followers, so few people see your updates.")
+    return lines[:MAX_ISSUES]
+
+
+def render(name, findings, personal=None, version=None):
+    """Fill template `version` (default PITCH_TEMPLATE) for one lead; returns the pitch text."""
+    t = TEMPLATES[version or DEFAULT_VERSION]
+    name = name or "there"
+    issues = issue_lines(findings)
+    parts = [t["greeting"].format(name=name), ""]
+    if issues:
+        parts.append(t["intro"].format(name=name))
+        parts.extend(t["issue"].format(issue=i) for i in issues)
+    else:
+        parts.append(t["no_issues"])
+    parts.append("")
+    if personal:
+        parts.append(personal)
+    parts += [t["value"], t["cta"], "", t["signoff"], "", t["optout"]]
+    return "\n".join(parts)
@@ -0,0 +1,144 @@
+# utils/spatial.py
+"""
+Small geo helpers and an in-memory spatial de-duplication index for discovered places.
+"""
+import math
+import re
+from urllib.parse import urlparse
+
+EARTH_RADIUS_KM = 6371.0088
+M_PER_DEG_LAT = 111320.0
+
+# words that say nothing about which business it is (incl. honorifics: "Dr. Shah Dental" == "Shah Dental")
+NAME_STOPWORDS = {"the", "and", "of", "pvt", "ltd", "private", "limited", "llp", "inc", "co",
+                  "dr", "mr", "mrs", "ms", "prof", "shri", "smt"}
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def name_tokens(name):
+    s = re.sub(r"[^\w\s]", " ", (name or "").lower())
+    return [t for t in s.split() if t not in NAME_STOPWORDS]
+
+def _domain(url):
+    if not url:
+        return None
+    host = urlparse(url if "//" in url else "//" + url).hostname or ""
+    return host[4:] if host.startswith("www.") else host or None
+
+
+class PlaceIndex:
+    """
+    De-duplicates places from several providers in O(1) amortized time per insert.
+
+    Places with coordinates go into a lat/lng grid whose cells are at least `threshold_m`
+    wide, and are indexed under each significant name token. A new place is compared only with
+    places sharing a token in the 3x3 neighbouring cells; it is merged when they are within
+    threshold_m and their names match (token overlap or one name containing the other).
+    Places without coordinates are matched by exact normalized name or website domain.
+    Equal provider ids (place_id) always merge.
+
+    Merged records keep the first record's fields, fill gaps from later ones, and list every
+    contributing record under "sources" (provenance).
+    """
+
+    def __init__(self, threshold_m=75.0):
+        self.threshold_m = threshold_m
+        self.cell_deg = threshold_m / M_PER_DEG_LAT
+        self.records = []
+        self.merged = 0
+        self._grid = {}       # (row, col, token) -> [record]
+        self._by_name = {}    # normalized full name -> record
+        self._by_domain = {}  # website domain -> record (used for coordless places)
+        self._by_id = {}      # provider place id -> record
+        self._in_grid = set() # id() of records already placed in the grid
+
+    def __len__(self):
+        return len(self.records)
+
+    def _row(self, lat):
+        return math.floor(lat / self.cell_deg)
+
+    def _col(self, row, lng):
+        # longitude cells are widened per row so they stay >= threshold_m on the ground
+        lat = (row + 0.5) * self.cell_deg
+        width = self.cell_deg / max(0.01, math.cos(math.radians(lat)))
+        return math.floor(lng / width)
+
+    @staticmethod
+    def _names_match(a, b):
+        ta, tb = set(name_tokens(a)), set(name_tokens(b))
+        if not ta or not tb:
+            return False
+        if ta <= tb or tb <= ta:
+            return True
+        return len(ta & tb) / len(ta | tb) >= 0.5
+
+    def _find(self, item):
+        pid = item.get("place_id")
+        if pid and pid in self._by_id:
+            return self._by_id[pid]
+        tokens = name_tokens(item.get("name"))
+        lat, lng = item.get("lat"), item.get("lng")
+        if lat is not None and lng is not None and tokens:
+            row = self._row(lat)
+            seen = set()
+            for r in (row - 1, row, row + 1):
+                col = self._col(r, lng)
+                for c in (col - 1, col, col + 1):
+                    for rec in (rec for t in set(tokens) for rec in self._grid.get((r, c, t), ())):
+                        if id(rec) in seen:
+                            continue
+                        seen.add(id(rec))
+                        if (haversine_km(lat, lng, rec["lat"], rec["lng"]) * 1000 <= self.threshold_m
+                                and self._names_match(item.get("name"), rec.get("name"))):
+                            return rec
+        key = " ".join(tokens)
+        rec = self._by_name.get(key) if key else None
+        if rec is not None and (rec.get("lat") is None or lat is None):
+            return rec
+        if lat is None:
+            dom = _domain(item.get("website"))
+            if dom and dom in self._by_domain:
+                return self._by_domain[dom]
+        return None
+
+    def _register(self, rec):
+        tokens = name_tokens(rec.get("name"))
+        if tokens:
+            self._by_name.setdefault(" ".join(tokens), rec)
+        if rec.get("place_id"):
+            self._by_id.setdefault(rec["place_id"], rec)
+        if rec.get("lat") is not None and rec.get("lng") is not None and tokens and id(rec) not in self._in_grid:
+            row = self._row(rec["lat"])
+            col = self._col(row, rec["lng"])
+            for t in set(tokens):
+                self._grid.setdefault((row, col, t), []).append(rec)
+            self._in_grid.add(id(rec))
+        dom = _domain(rec.get("website"))
+        if dom:
+            self._by_domain.setdefault(dom, rec)
+
+    def add(self, item, source=None):
+        """Insert a place dict; returns (record, merged)."""
+        source = source or item.get("source")
+        prov = {"source": source, "name": item.get("name"), "lat": item.get("lat"), "lng": item.get("lng")}
+        if item.get("place_id"):
+            prov["place_id"] = item["place_id"]
+        rec = self._find(item)
+        if rec is None:
+            rec = {**item, "source": source, "sources": [prov]}
+            self.records.append(rec)
+            self._register(rec)
+            return rec, False
+        rec["sources"].append(prov)
+        for k, v in item.items():
+            if v is not None and rec.get(k) is None:
+                rec[k] = v
+        self._register(rec)
+        self.merged += 1
+        return rec, True
@@ -0,0 +1,103 @@
+# utils/translation.py
+"""
+Batched machine translation for pitches.
+Texts are split into sentences (paragraph breaks kept). The unique sentences of all texts are
+translated in one batched pass, and each text is rebuilt in its original order. Translating
+sentence by sentence means long pitches are never truncated to the model's input window.
+
+Translator models live in a small LRU pool keyed by language pair (TRANSLATOR_POOL_SIZE), so
+adding languages to TRANSLATORS does not keep every model resident.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from utils import generation_cache, llm_worker, model_registry
+
+# (source, target) -> seq2seq model name
+TRANSLATORS = {
+    ("en", "hi"): "Helsinki-NLP/opus-mt-en-hi",
+}
+POOL_SIZE = int(os.getenv("TRANSLATOR_POOL_SIZE", "2"))
+# per sentence, so this only has to cover one sentence's worth of output
+MAX_NEW_TOKENS = int(os.getenv("TRANSLATE_MAX_NEW_TOKENS", "128"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_PARAGRAPH = re.compile(r"(\n+)")
+
+
+def supports(src, tgt):
+    return (src.lower(), tgt.lower()) in TRANSLATORS
+
+
+def split_sentences(text):
+    """
+    Split text into sentences. Returns (sentences, layout): layout is a list of
+    ("s", index into sentences) and ("sep", separator string) that rebuilds the text.
+    """
+    sentences, layout = [], []
+    for part in _PARAGRAPH.split(text or ""):
+        if not part:
+            continue
+        if part.startswith("\n"):
+            layout.append(("sep", part))
+            continue
+        for i, sentence in enumerate(s for s in _SENTENCE_END.split(part.strip()) if s):
+            if i:
+                layout.append(("sep", " "))
+            layout.append(("s", len(sentences)))
+            sentences.append(sentence)
+    return sentences, layout
+
+
+def join_sentences(sentences, layout):
+    return "".join(sentences[v] if kind == "s" else v for kind, v in layout)
+
+
+class TranslatorPool:
+    """LRU of model handles by language pair; evicted models are unloaded from the registry."""
+
+    def __init__(self, max_models=POOL_SIZE):
+        self.max_models = max_models
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, src, tgt):
+        pair = (src.lower(), tgt.lower())
+        if pair not in TRANSLATORS:
+            raise ValueError(f"No translator configured for {pair[0]}->{pair[1]}")
+        evicted = []
+        with self._lock:
+            handle = self._handles.get(pair)
+            if handle is None:
+                handle = self._handles[pair] = model_registry.acquire(TRANSLATORS[pair])
+            self._handles.move_to_end(pair)
+            while len(self._handles) > self.max_models:
+                evicted.append(self._handles.popitem(last=False)[1])
+        for h in evicted:
+            h.release()
+        if evicted:
+            model_registry.registry.unload_unused()
+        return handle
+
+    def close(self):
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for h in handles:
+            h.release()
+
+
+# the process-wide pool
+pool = TranslatorPool()
+
+
+def translate_batch(texts, src="en", tgt="hi", batch_size=None):
+    """Translate many texts at once; returns one translation per text, in order."""
+    handle = pool.get(src, tgt)
+    plans = [split_sentences(t) for t in texts]
+    unique = list(OrderedDict.fromkeys(s for sentences, _ in plans for s in sentences))
+    translated = dict(zip(unique, generation_cache.generate(
+        handle.cache_id, {"max_new_tokens": MAX_NEW_TOKENS}, unique,
+        lambda todo: llm_worker.generate(handle, todo, max_new_tokens=MAX_NEW_TOKENS, batch_size=batch_size))))
+    return [join_sentences([translated[s] for s in sentences], layout) for sentences, layout in plans]